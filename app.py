@@ -7,7 +7,7 @@ import streamlit as st
 import os
 from dotenv import load_dotenv
 from src.llm_client import LLMClient
-from src.code_executor import CodeExecutor
+from src.code_executor import execute_code
 from src.utils import clean_code, format_error_message
 from components.language_selector import language_selector, language_selector_with_default, dual_language_selector, language_info_display
 from components.code_display import (
@@ -92,6 +92,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_llm_client() -> LLMClient:
+    """Create the LLM client once per process so its connections and cache persist across reruns."""
+    return LLMClient()
+
 def main():
     """Main application function."""
     
@@ -100,7 +105,7 @@ def main():
     st.markdown('<p class="sub-header">Transform natural language into working code in any programming language</p>', unsafe_allow_html=True)
     
     # Initialize LLM client
-    llm_client = LLMClient()
+    llm_client = get_llm_client()
     
     # Check if any LLM is available
     if not llm_client.is_available():
@@ -225,7 +230,12 @@ def main():
                             rag_engine = st.session_state.rag_engine
                             rag_context = rag_engine.get_code_context(task, context_chunks)
                         
-                        result = llm_client.generate_code(task, language, selected_model, use_rag, rag_context)
+                        # Stream tokens as they arrive, then replace them with the formatted result
+                        result = {}
+                        stream_placeholder = st.empty()
+                        with stream_placeholder.container():
+                            st.write_stream(llm_client.generate_code_stream(task, language, selected_model, use_rag, rag_context, result))
+                        stream_placeholder.empty()
                         
                         if "error" in result:
                             # Check if it's a rate limit error
@@ -458,8 +468,7 @@ def main():
             else:
                 with st.spinner("Executing code..."):
                     try:
-                        executor = CodeExecutor()
-                        result = executor.execute_code(code_to_execute, exec_language)
+                        result = execute_code(code_to_execute, exec_language)
                         
                         if result["success"]:
                             st.success("Code executed successfully!")
@@ -70,7 +70,7 @@ def display_code_with_execution(code: str, language: str, title: str = "Generate
         title: Title for the code section
     """
     from src.utils import is_executable_language
-    from src.code_executor import CodeExecutor
+    from src.code_executor import execute_code
     
     # Display the code
     display_code(code, language, title)
@@ -90,8 +90,7 @@ def display_code_with_execution(code: str, language: str, title: str = "Generate
         if execute_button:
             try:
                 with st.spinner("Executing code..."):
-                    executor = CodeExecutor()
-                    result = executor.execute_code(code, language)
+                    result = execute_code(code, language)
                     
                     if result["success"]:
                         st.success("Code executed successfully!")
@@ -165,7 +165,7 @@ def code_library_tab():
         
         # Get unique files from metadata
         files_info = {}
-        for chunk in rag_engine.metadata:
+        for chunk in rag_engine.metadata.values():
             filename = chunk['filename']
             if filename not in files_info:
                 files_info[filename] = {
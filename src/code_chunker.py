@@ -0,0 +1,576 @@
+"""
+Code Chunker for AnyLang AI Code Writer
+Splits source files into functions, classes and other logical blocks.
+Kept free of the embedding stack so parser worker processes start quickly.
+"""
+
+import re
+import ast
+import logging
+import textwrap
+import warnings
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import numpy as np
+
+# Linear-time RE2 matching for the chunk patterns when available; no catastrophic backtracking
+try:
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
+# Syntax-tree chunking for brace languages when tree-sitter grammars are installed; regex otherwise
+try:
+    from tree_sitter_languages import get_parser as _get_ts_parser
+except ImportError:
+    _get_ts_parser = None
+
+logger = logging.getLogger(__name__)
+
+# Statement-list fields of compound Python statements (if/for/while/with/try/match)
+_BLOCK_FIELDS = ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+
+def _newline_offsets(content: str) -> np.ndarray:
+    """Return the character offset of every newline in content, in order."""
+    if content.isascii():
+        codes = np.frombuffer(content.encode('ascii'), dtype=np.uint8)
+    else:
+        # UTF-32 has one code unit per character, so unit positions are str offsets
+        codes = np.frombuffer(content.encode('utf-32-le'), dtype=np.uint32)
+    return np.flatnonzero(codes == 10)
+
+def _compile_patterns(*patterns: str) -> Tuple[re.Pattern, ...]:
+    """Compile chunk patterns with DOTALL and MULTILINE, using RE2 when it is installed."""
+    compiled = []
+    for pattern in patterns:
+        # Inline flags work the same in re and both RE2 bindings
+        try:
+            compiled.append(_regex.compile("(?sm)" + pattern))
+        except Exception:
+            compiled.append(re.compile("(?sm)" + pattern))
+    return tuple(compiled)
+
+# File extension -> language whose parser chunks it
+SUPPORTED = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.cs': 'csharp',
+    '.rs': 'rust',
+    '.go': 'go',
+    '.php': 'php',
+    '.rb': 'ruby',
+    '.swift': 'swift',
+    '.kt': 'kotlin',
+    '.scala': 'scala',
+    '.dart': 'dart',
+    '.r': 'r',
+    '.m': 'matlab',
+    '.sql': 'sql',
+    '.sh': 'bash',
+    '.html': 'html',
+    '.css': 'css',
+    '.vue': 'vue',
+    '.jsx': 'jsx',
+    # TSX is chunked like JSX
+    '.tsx': 'jsx'
+}
+
+# Extensions with a dedicated parser, for membership checks
+SUPPORTED_EXTENSIONS = frozenset(SUPPORTED)
+
+class CodeChunker:
+    """Handles code parsing and chunking for different programming languages."""
+    
+    supported_extensions = SUPPORTED_EXTENSIONS
+    
+    # Chunk patterns per language, compiled once for every instance
+    _PATTERNS = {
+        'javascript': _compile_patterns(
+            r'(?:export\s+)?(?:async\s+)?function\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'(?:export\s+)?class\s+(\w+)\s*\{[^}]*\}',
+            r'const\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{[^}]*\}',
+            r'let\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{[^}]*\}',
+            r'var\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{[^}]*\}'
+        ),
+        'java': _compile_patterns(
+            r'(?:public\s+)?class\s+(\w+)\s*\{[^}]*\}',
+            r'(?:public\s+|private\s+|protected\s+)?(?:static\s+)?(?:final\s+)?(?:synchronized\s+)?(?:native\s+)?(?:abstract\s+)?(?:default\s+)?(?:<[^>]*>\s+)?(?:[\w\[\]<>]+\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}'
+        ),
+        'cpp': _compile_patterns(
+            r'class\s+(\w+)\s*\{[^}]*\}',
+            r'(?:template\s*<[^>]*>\s*)?(?:inline\s+)?(?:static\s+)?(?:const\s+)?(?:virtual\s+)?(?:explicit\s+)?(?:[\w:<>]+\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}'
+        ),
+        'csharp': _compile_patterns(
+            r'(?:public\s+|private\s+|protected\s+|internal\s+)?(?:abstract\s+)?(?:sealed\s+)?(?:partial\s+)?(?:static\s+)?class\s+(\w+)\s*\{[^}]*\}',
+            r'(?:public\s+|private\s+|protected\s+|internal\s+)?(?:virtual\s+)?(?:override\s+)?(?:abstract\s+)?(?:static\s+)?(?:async\s+)?(?:[\w<>]+\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}'
+        ),
+        'rust': _compile_patterns(
+            r'fn\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'struct\s+(\w+)\s*\{[^}]*\}',
+            r'impl\s+(\w+)\s*\{[^}]*\}'
+        ),
+        'go': _compile_patterns(
+            r'func\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'type\s+(\w+)\s+struct\s*\{[^}]*\}'
+        ),
+        'php': _compile_patterns(
+            r'function\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'class\s+(\w+)\s*\{[^}]*\}'
+        ),
+        'ruby': _compile_patterns(
+            r'def\s+(\w+)[^}]*end',
+            r'class\s+(\w+)[^}]*end'
+        ),
+        'swift': _compile_patterns(
+            r'func\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'class\s+(\w+)\s*\{[^}]*\}',
+            r'struct\s+(\w+)\s*\{[^}]*\}'
+        ),
+        'kotlin': _compile_patterns(
+            r'fun\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'class\s+(\w+)\s*\{[^}]*\}',
+            r'data\s+class\s+(\w+)\s*\([^)]*\)'
+        ),
+        'scala': _compile_patterns(
+            r'def\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'class\s+(\w+)\s*\{[^}]*\}',
+            r'object\s+(\w+)\s*\{[^}]*\}'
+        ),
+        'dart': _compile_patterns(
+            r'(?:void\s+|int\s+|String\s+|bool\s+|double\s+|dynamic\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'class\s+(\w+)\s*\{[^}]*\}'
+        ),
+        'r': _compile_patterns(
+            r'(\w+)\s*<-\s*function\s*\([^)]*\)\s*\{[^}]*\}'
+        ),
+        'matlab': _compile_patterns(
+            r'function\s+(\w+)\s*\([^)]*\)[^}]*end'
+        ),
+        'sql': _compile_patterns(
+            r'(?:CREATE|INSERT|UPDATE|DELETE|SELECT)\s+[^;]+;'
+        ),
+        'bash': _compile_patterns(
+            r'(\w+)\s*\(\)\s*\{[^}]*\}'
+        ),
+        'html': _compile_patterns(
+            r'<[^>]+>[^<]*</[^>]+>',
+            r'<[^>]+/>'
+        ),
+        'css': _compile_patterns(
+            r'[^{}]+\{[^}]*\}'
+        ),
+        'vue': _compile_patterns(
+            r'<template>[^<]*</template>',
+            r'<script>[^<]*</script>',
+            r'<style>[^<]*</style>'
+        ),
+        'jsx': _compile_patterns(
+            r'(?:export\s+)?(?:default\s+)?(?:function\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
+            r'(?:export\s+)?(?:default\s+)?class\s+(\w+)\s*\{[^}]*\}'
+        )
+    }
+    
+    # Definition node types per tree-sitter grammar, mapped to chunk types
+    _TS_NODE_TYPES = {
+        'javascript': {
+            'function_declaration': 'function', 'generator_function_declaration': 'function',
+            'class_declaration': 'class', 'method_definition': 'method',
+            'variable_declarator': 'function'
+        },
+        'typescript': {
+            'function_declaration': 'function', 'generator_function_declaration': 'function',
+            'class_declaration': 'class', 'abstract_class_declaration': 'class',
+            'interface_declaration': 'interface', 'method_definition': 'method',
+            'variable_declarator': 'function'
+        },
+        'java': {
+            'class_declaration': 'class', 'interface_declaration': 'interface',
+            'enum_declaration': 'enum', 'method_declaration': 'method',
+            'constructor_declaration': 'method'
+        },
+        'cpp': {
+            'function_definition': 'function', 'class_specifier': 'class',
+            'struct_specifier': 'struct'
+        },
+        'rust': {
+            'function_item': 'function', 'struct_item': 'struct', 'enum_item': 'enum',
+            'trait_item': 'trait', 'impl_item': 'impl'
+        },
+        'go': {
+            'function_declaration': 'function', 'method_declaration': 'method',
+            'type_declaration': 'type'
+        }
+    }
+    
+    # JS/TS variable declarators are only chunked when they bind a function
+    _TS_FUNCTION_VALUES = frozenset(('arrow_function', 'function', 'function_expression', 'generator_function'))
+    
+    # language -> tree-sitter parser, or None if its grammar could not be loaded
+    _ts_parsers: Dict[str, Any] = {}
+    
+    def chunk_file(self, file_path: str) -> List[Dict[str, Any]]:
+        """Chunk a single file on disk into logical code blocks."""
+        file_path = Path(file_path)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception as e:
+            logger.error(f"Error reading file {file_path}: {e}")
+            return []
+        
+        return self.chunk_text(file_path.name, content)
+    
+    def chunk_bytes(self, name: str, data: bytes) -> List[Dict[str, Any]]:
+        """Chunk an in-memory file, such as an upload, without writing it to disk."""
+        return self.chunk_text(name, data.decode('utf-8', errors='replace'))
+    
+    def chunk_text(self, name: str, content: str) -> List[Dict[str, Any]]:
+        """
+        Chunk source text into logical code blocks.
+        
+        Args:
+            name: File name; its extension selects the parser
+            content: Decoded file contents
+        
+        Returns:
+            List of chunk dicts
+        """
+        name = Path(name)
+        language = SUPPORTED.get(name.suffix.lower())
+        # Parsers split lines on '\n' only; a CRLF upload would otherwise leave '\r' in every
+        # chunk and hash differently from the same code with LF endings
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        
+        if language is None:
+            return self._parse_generic(content, name.stem)
+        
+        try:
+            return self._DISPATCH[language](self, content, name.stem)
+        except Exception as e:
+            logger.warning(f"Failed to parse {name}: {e}")
+            return self._parse_generic(content, name.stem)
+    
+    def _parse_python(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Python file into functions, classes, and modules."""
+        chunks = []
+        
+        try:
+            tree = ast.parse(content)
+            # AST line numbers count only '\n'; splitlines would also break on \f, \v, \x85 etc.
+            lines = content.split('\n')
+            
+            # Definitions anywhere outside function bodies, including class members and those
+            # under if/try/with/for blocks; functions nested in function bodies stay part of
+            # their enclosing chunk instead of being emitted again
+            pending = list(reversed(tree.body))
+            while pending:
+                node = pending.pop()
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    chunk = {
+                        'type': 'function',
+                        'name': node.name,
+                        'code': self._node_source(lines, node),
+                        'start_line': node.lineno,
+                        'end_line': node.end_lineno if hasattr(node, 'end_lineno') else node.lineno,
+                        'docstring': ast.get_docstring(node) or ''
+                    }
+                    chunks.append(chunk)
+                
+                elif isinstance(node, ast.ClassDef):
+                    chunk = {
+                        'type': 'class',
+                        'name': node.name,
+                        'code': self._node_source(lines, node),
+                        'start_line': node.lineno,
+                        'end_line': node.end_lineno if hasattr(node, 'end_lineno') else node.lineno,
+                        'docstring': ast.get_docstring(node) or ''
+                    }
+                    chunks.append(chunk)
+                    pending.extend(reversed(node.body))
+                
+                else:
+                    pending.extend(reversed([child for field in _BLOCK_FIELDS
+                                             for child in getattr(node, field, ())]))
+            
+            # If no functions/classes found, create a module chunk
+            if not chunks:
+                chunks.append({
+                    'type': 'module',
+                    'name': stem,
+                    'code': content,
+                    'start_line': 1,
+                    'end_line': content.count('\n') + 1,
+                    'docstring': ''
+                })
+                
+        except Exception as e:
+            logger.error(f"Error parsing Python file {stem}: {e}")
+            # Fallback to generic parsing
+            return self._parse_generic(content, stem)
+        
+        return chunks
+    
+    @staticmethod
+    def _node_source(lines: List[str], node: ast.AST) -> str:
+        """Slice a definition's source, decorators included, out of the file's lines."""
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        code = "\n".join(lines[start - 1:node.end_lineno])
+        # Methods are indented inside their class; present them flush-left
+        return textwrap.dedent(code) if node.col_offset else code
+    
+    def _parse_javascript(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse JavaScript file into functions and classes."""
+        return (self._parse_treesitter(content, stem, 'javascript')
+                or self._parse_generic_with_regex(content, stem, self._PATTERNS['javascript']))
+    
+    def _parse_typescript(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse TypeScript file (similar to JavaScript but with types)."""
+        return (self._parse_treesitter(content, stem, 'typescript')
+                or self._parse_generic_with_regex(content, stem, self._PATTERNS['javascript']))
+    
+    def _parse_java(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Java file into classes and methods."""
+        return (self._parse_treesitter(content, stem, 'java')
+                or self._parse_generic_with_regex(content, stem, self._PATTERNS['java']))
+    
+    def _parse_cpp(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse C++ file into classes and functions."""
+        return (self._parse_treesitter(content, stem, 'cpp')
+                or self._parse_generic_with_regex(content, stem, self._PATTERNS['cpp']))
+    
+    def _parse_csharp(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse C# file into classes and methods."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['csharp'])
+    
+    def _parse_rust(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Rust file into functions and structs."""
+        return (self._parse_treesitter(content, stem, 'rust')
+                or self._parse_generic_with_regex(content, stem, self._PATTERNS['rust']))
+    
+    def _parse_go(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Go file into functions and structs."""
+        return (self._parse_treesitter(content, stem, 'go')
+                or self._parse_generic_with_regex(content, stem, self._PATTERNS['go']))
+    
+    def _parse_php(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse PHP file into functions and classes."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['php'])
+    
+    def _parse_ruby(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Ruby file into methods and classes."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['ruby'])
+    
+    def _parse_swift(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Swift file into functions and classes."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['swift'])
+    
+    def _parse_kotlin(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Kotlin file into functions and classes."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['kotlin'])
+    
+    def _parse_scala(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Scala file into functions and classes."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['scala'])
+    
+    def _parse_dart(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Dart file into functions and classes."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['dart'])
+    
+    def _parse_r(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse R file into functions."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['r'])
+    
+    def _parse_matlab(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse MATLAB file into functions."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['matlab'])
+    
+    def _parse_sql(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse SQL file into statements."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['sql'])
+    
+    def _parse_bash(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Bash file into functions."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['bash'])
+    
+    def _parse_html(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse HTML file into sections."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['html'])
+    
+    def _parse_css(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse CSS file into rules."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['css'])
+    
+    def _parse_vue(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse Vue file into template, script, and style sections."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['vue'])
+    
+    def _parse_jsx(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Parse JSX file into components."""
+        return self._parse_generic_with_regex(content, stem, self._PATTERNS['jsx'])
+    
+    @classmethod
+    def _ts_parser(cls, language: str):
+        """Return the cached tree-sitter parser for a language, or None if unavailable."""
+        if language not in cls._ts_parsers:
+            parser = None
+            if _get_ts_parser is not None:
+                try:
+                    with warnings.catch_warnings():
+                        # tree_sitter_languages loads grammars through a deprecated constructor
+                        warnings.simplefilter('ignore', FutureWarning)
+                        parser = _get_ts_parser(language)
+                except Exception as e:
+                    logger.warning(f"tree-sitter grammar for {language} unavailable, using regex: {e}")
+            cls._ts_parsers[language] = parser
+        return cls._ts_parsers[language]
+    
+    @classmethod
+    def _ts_name(cls, node) -> Optional[str]:
+        """Find a definition's name: its name field, else the innermost declarator or type."""
+        name = node.child_by_field_name('name')
+        if name is not None:
+            return name.text.decode('utf-8', errors='replace')
+        for field in ('declarator', 'type'):
+            child = node.child_by_field_name(field)
+            if child is not None:
+                return cls._ts_name(child) or child.text.decode('utf-8', errors='replace')
+        # Go wraps the named spec in a type_declaration
+        if node.type == 'type_declaration' and node.named_children:
+            return cls._ts_name(node.named_children[0])
+        return None
+    
+    def _parse_treesitter(self, content: str, stem: str, language: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Parse file contents into definitions using a tree-sitter syntax tree.
+        
+        Args:
+            content: Decoded file contents
+            stem: File name without extension, used for the whole-file fallback chunk
+            language: tree-sitter grammar name, a key of _TS_NODE_TYPES
+        
+        Returns:
+            List of chunk dicts, or None if no parser is available for the language
+        """
+        parser = self._ts_parser(language)
+        if parser is None:
+            return None
+        
+        data = content.encode('utf-8')
+        node_types = self._TS_NODE_TYPES[language]
+        chunks = []
+        
+        stack = [parser.parse(data).root_node]
+        while stack:
+            node = stack.pop()
+            # Visit children in source order
+            stack.extend(reversed(node.named_children))
+            
+            chunk_type = node_types.get(node.type)
+            if chunk_type is None:
+                continue
+            span = node
+            if node.type == 'variable_declarator':
+                value = node.child_by_field_name('value')
+                if value is None or value.type not in self._TS_FUNCTION_VALUES:
+                    continue
+                # Include the const/let keyword
+                span = node.parent
+            elif node.type.endswith('_specifier') and node.child_by_field_name('body') is None:
+                # C++ forward declarations and elaborated type uses
+                continue
+            
+            chunks.append({
+                'type': chunk_type,
+                'name': self._ts_name(node) or f"block_{len(chunks)}",
+                'code': data[span.start_byte:span.end_byte].decode('utf-8', errors='replace'),
+                'start_line': span.start_point[0] + 1,
+                'end_line': span.end_point[0] + 1,
+                'docstring': ''
+            })
+        
+        return chunks or self._parse_generic(content, stem)
+    
+    def _parse_generic_with_regex(self, content: str, stem: str,
+                                  patterns: Tuple[re.Pattern, ...]) -> List[Dict[str, Any]]:
+        """Parse file contents using precompiled regex patterns."""
+        chunks = []
+        
+        try:
+            matches = [match for pattern in patterns for match in pattern.finditer(content)]
+            if matches:
+                # Line of an offset = newlines before it + 1, binary-searched for all matches at once
+                offsets = np.array([match.span() for match in matches], dtype=np.int64)
+                lines = (np.searchsorted(_newline_offsets(content), offsets) + 1).tolist()
+                
+                for match, (start_line, end_line) in zip(matches, lines):
+                    chunk = {
+                        'type': 'code_block',
+                        'name': match.group(1) if match.groups() else f"block_{len(chunks)}",
+                        'code': match.group(0),
+                        'start_line': start_line,
+                        'end_line': end_line,
+                        'docstring': ''
+                    }
+                    chunks.append(chunk)
+            
+            # If no matches found, create a single chunk
+            if not chunks:
+                chunks.append({
+                    'type': 'file',
+                    'name': stem,
+                    'code': content,
+                    'start_line': 1,
+                    'end_line': content.count('\n') + 1,
+                    'docstring': ''
+                })
+                
+        except Exception as e:
+            logger.error(f"Error parsing file {stem}: {e}")
+            return self._parse_generic(content, stem)
+        
+        return chunks
+    
+    def _parse_generic(self, content: str, stem: str) -> List[Dict[str, Any]]:
+        """Generic parser for unsupported file types."""
+        return [{
+            'type': 'file',
+            'name': stem,
+            'code': content,
+            'start_line': 1,
+            'end_line': content.count('\n') + 1,
+            'docstring': ''
+        }]
+    
+    # language -> parser, shared by all instances; called as _DISPATCH[language](self, content, stem)
+    _DISPATCH = {
+        'python': _parse_python,
+        'javascript': _parse_javascript,
+        'typescript': _parse_typescript,
+        'java': _parse_java,
+        'cpp': _parse_cpp,
+        'csharp': _parse_csharp,
+        'rust': _parse_rust,
+        'go': _parse_go,
+        'php': _parse_php,
+        'ruby': _parse_ruby,
+        'swift': _parse_swift,
+        'kotlin': _parse_kotlin,
+        'scala': _parse_scala,
+        'dart': _parse_dart,
+        'r': _parse_r,
+        'matlab': _parse_matlab,
+        'sql': _parse_sql,
+        'bash': _parse_bash,
+        'html': _parse_html,
+        'css': _parse_css,
+        'vue': _parse_vue,
+        'jsx': _parse_jsx
+    }
+
+def _chunk_one(name: str, data: bytes) -> List[Dict[str, Any]]:
+    """Chunk one uploaded file; module-level so worker processes can run it."""
+    return CodeChunker().chunk_bytes(name, data)
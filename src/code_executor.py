@@ -3,13 +3,17 @@ Safe Code Execution Module for AnyLang AI Code Writer
 Handles safe execution of Python, SQL, and Bash code with security sandboxing.
 """
 
+import ast
+import functools
 import subprocess
 import sqlite3
 import tempfile
 import os
 import re
+import signal
 import logging
-from typing import Dict, Any, Optional
+from types import CodeType
+from typing import Dict, Any, Optional, Tuple
 from io import StringIO
 import sys
 import contextlib
@@ -17,14 +21,57 @@ from io import UnsupportedOperation
 
 logger = logging.getLogger(__name__)
 
+# Modules and builtins rejected by the Python safety check
+_DANGEROUS_IMPORTS = frozenset(['os', 'subprocess', 'sys', 'shutil', 'glob'])
+_DANGEROUS_FUNCTIONS = frozenset(['eval', 'exec', 'compile', '__import__'])
+
+# Maximum number of compiled Python snippets kept per process
+PY_CODE_CACHE_SIZE = 256
+
+# SQL line and block comments, stripped before classifying a statement
+_SQL_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+
+@functools.lru_cache(maxsize=PY_CODE_CACHE_SIZE)
+def _compile_python(code: str) -> Tuple[CodeType, Optional[CodeType]]:
+    """
+    Compile Python code for execution, reusing cached code objects.
+    
+    Args:
+        code: Python source to compile
+    
+    Returns:
+        Tuple of the module code object and, if the last statement is an
+        expression containing a call, an eval code object for it
+    """
+    tree = ast.parse(code)
+    exec_code = compile(tree, '<snippet>', 'exec')
+    
+    eval_code = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last_expr = tree.body[-1].value
+        if any(isinstance(node, ast.Call) for node in ast.walk(last_expr)):
+            eval_code = compile(ast.Expression(last_expr), '<snippet>', 'eval')
+    
+    return exec_code, eval_code
+
+# Prepended to bash scripts: 2 s of CPU, 256 MB of address space and no file writes
+_BASH_LIMITS = 'ulimit -t 2 -v 262144 -f 0; '
+
+def _signal_name(signum: int) -> str:
+    """Name the signal that terminated a child process."""
+    try:
+        return signal.Signals(signum).name
+    except ValueError:
+        return f"signal {signum}"
+
 class CodeExecutor:
     """Safe code executor for Python, SQL, and Bash."""
     
     def __init__(self):
         self.dangerous_patterns = [
-            r'import\s+os\s*$',
-            r'import\s+subprocess\s*$',
-            r'import\s+sys\s*$',
+            r'^\s*import\s+os\s*$',
+            r'^\s*import\s+subprocess\s*$',
+            r'^\s*import\s+sys\s*$',
             r'__import__\s*\(',
             r'eval\s*\(',
             r'exec\s*\(',
@@ -40,6 +87,22 @@ class CodeExecutor:
             r'DELETE\s+FROM\s+.*\s+WHERE\s+1\s*=\s*1',
             r'TRUNCATE\s+TABLE',
         ]
+        self._dangerous_res = [
+            re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+            for pattern in self.dangerous_patterns
+        ]
+        
+        # Language -> handler tables for safety checks and execution
+        self._safety_dispatch = {
+            "python": self._check_python_safety,
+            "sql": self._check_sql_safety,
+            "bash": self._check_bash_safety,
+        }
+        self._exec_dispatch = {
+            "python": self._execute_python,
+            "sql": self._execute_sql,
+            "bash": self._execute_bash,
+        }
     
     def is_safe_to_execute(self, code: str, language: str) -> Dict[str, Any]:
         """
@@ -53,54 +116,66 @@ class CodeExecutor:
             Dict with safety assessment
         """
         # Check for dangerous patterns
-        for pattern in self.dangerous_patterns:
-            if re.search(pattern, code, re.IGNORECASE | re.MULTILINE):
+        for pattern in self._dangerous_res:
+            if pattern.search(code):
                 return {
                     "safe": False,
-                    "reason": f"Potentially dangerous pattern detected: {pattern}",
+                    "reason": f"Potentially dangerous pattern detected: {pattern.pattern}",
                     "code": code,
                     "language": language
                 }
         
         # Language-specific checks
-        if language.lower() == "python":
-            return self._check_python_safety(code)
-        elif language.lower() == "sql":
-            return self._check_sql_safety(code)
-        elif language.lower() == "bash":
-            return self._check_bash_safety(code)
-        else:
+        check = self._safety_dispatch.get(language.lower())
+        if check is None:
             return {
                 "safe": False,
                 "reason": f"Execution not supported for {language}",
                 "code": code,
                 "language": language
             }
+        return check(code)
     
     def _check_python_safety(self, code: str) -> Dict[str, Any]:
-        """Check Python code safety."""
-        dangerous_imports = ['os', 'subprocess', 'sys', 'shutil', 'glob']
-        dangerous_functions = ['eval', 'exec', 'compile', '__import__']
-        
-        # Check for dangerous imports
-        for imp in dangerous_imports:
-            if re.search(rf'import\s+{imp}', code, re.IGNORECASE):
-                return {
-                    "safe": False,
-                    "reason": f"Dangerous import detected: {imp}",
-                    "code": code,
-                    "language": "python"
-                }
+        """Check Python code safety by walking its syntax tree."""
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return {
+                "safe": False,
+                "reason": f"Syntax error: {e.msg} (line {e.lineno})",
+                "code": code,
+                "language": "python"
+            }
         
-        # Check for dangerous functions
-        for func in dangerous_functions:
-            if re.search(rf'{func}\s*\(', code, re.IGNORECASE):
-                return {
-                    "safe": False,
-                    "reason": f"Dangerous function detected: {func}",
-                    "code": code,
-                    "language": "python"
-                }
+        for node in ast.walk(tree):
+            # Check for dangerous imports
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                modules = [node.module or ""]
+            else:
+                modules = []
+            for module in modules:
+                imp = module.split('.')[0]
+                if imp in _DANGEROUS_IMPORTS:
+                    return {
+                        "safe": False,
+                        "reason": f"Dangerous import detected: {imp}",
+                        "code": code,
+                        "language": "python"
+                    }
+            
+            # Check for dangerous functions, called directly or as attributes
+            if isinstance(node, ast.Call):
+                func = getattr(node.func, 'id', None) or getattr(node.func, 'attr', None)
+                if func in _DANGEROUS_FUNCTIONS:
+                    return {
+                        "safe": False,
+                        "reason": f"Dangerous function detected: {func}",
+                        "code": code,
+                        "language": "python"
+                    }
         
         return {
             "safe": True,
@@ -186,19 +261,15 @@ class CodeExecutor:
                 }
             
             # Execute based on language
-            if language.lower() == "python":
-                return self._execute_python(code)
-            elif language.lower() == "sql":
-                return self._execute_sql(code)
-            elif language.lower() == "bash":
-                return self._execute_bash(code)
-            else:
+            execute = self._exec_dispatch.get(language.lower())
+            if execute is None:
                 return {
                     "success": False,
                     "output": f"Language {language} not supported for execution",
                     "error": f"Unsupported language: {language}",
                     "language": language
                 }
+            return execute(code)
                 
         except Exception as e:
             return {
@@ -356,6 +427,9 @@ class CodeExecutor:
                             "language": "python"
                         }
                 
+                # Parse and compile once; the last-expression code object is reused below
+                exec_code, eval_code = _compile_python(code)
+                
                 # Execute the code with timeout protection
                 import signal
                 
@@ -367,7 +441,7 @@ class CodeExecutor:
                 signal.alarm(5)
                 
                 try:
-                    exec(code, restricted_globals)
+                    exec(exec_code, restricted_globals)
                     signal.alarm(0)  # Cancel the alarm
                 except TimeoutError:
                     signal.alarm(0)  # Cancel the alarm
@@ -384,19 +458,15 @@ class CodeExecutor:
                 
                 # If no output but code executed successfully, try to get the result
                 if not output and not error_output:
-                    # Try to evaluate the last expression if it's a simple one
-                    lines = code.strip().split('\n')
-                    if lines:
-                        last_line = lines[-1].strip()
-                        # If the last line looks like a function call or expression
-                        if '(' in last_line and ')' in last_line and not last_line.startswith('#'):
-                            try:
-                                result = eval(last_line, restricted_globals)
-                                output = f"Result: {result}"
-                            except:
-                                output = "Code executed successfully (no output)"
-                        else:
+                    # Try to evaluate the last expression if it's a call
+                    if eval_code is not None:
+                        try:
+                            result = eval(eval_code, restricted_globals)
+                            output = f"Result: {result}"
+                        except (NameError, TypeError, ValueError, ArithmeticError, LookupError, AttributeError):
                             output = "Code executed successfully (no output)"
+                    else:
+                        output = "Code executed successfully (no output)"
                 elif not output:
                     output = "Code executed successfully (no output)"
                 
@@ -416,48 +486,59 @@ class CodeExecutor:
                 "language": "python"
             }
     
+    def _is_select_only(self, code: str) -> bool:
+        """Check whether SQL code is a plain SELECT statement."""
+        stripped = _SQL_COMMENT_RE.sub('', code).lstrip()
+        return stripped[:6].upper() == 'SELECT'
+    
     def _execute_sql(self, code: str) -> Dict[str, Any]:
         """Execute SQL code safely using in-memory SQLite."""
+        conn = None
         try:
             # Create in-memory database
             conn = sqlite3.connect(':memory:')
             cursor = conn.cursor()
             
-            # Create some sample tables for testing
-            cursor.execute('''
+            # Create some sample tables for testing in a single transaction
+            conn.executescript('''
+                BEGIN;
                 CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY,
                     name TEXT,
                     email TEXT,
                     age INTEGER
-                )
-            ''')
-            
-            cursor.execute('''
-                INSERT INTO users (name, email, age) VALUES 
-                ('Alice', 'alice@example.com', 25),
-                ('Bob', 'bob@example.com', 30),
-                ('Charlie', 'charlie@example.com', 35)
-            ''')
-            
-            cursor.execute('''
+                );
                 CREATE TABLE IF NOT EXISTS products (
                     id INTEGER PRIMARY KEY,
                     name TEXT,
                     price REAL,
                     category TEXT
-                )
-            ''')
-            
-            cursor.execute('''
-                INSERT INTO products (name, price, category) VALUES 
-                ('Laptop', 999.99, 'Electronics'),
-                ('Book', 19.99, 'Books'),
-                ('Phone', 599.99, 'Electronics')
+                );
+                COMMIT;
             ''')
             
+            cursor.executemany(
+                'INSERT INTO users (name, email, age) VALUES (?, ?, ?)',
+                [
+                    ('Alice', 'alice@example.com', 25),
+                    ('Bob', 'bob@example.com', 30),
+                    ('Charlie', 'charlie@example.com', 35),
+                ]
+            )
+            cursor.executemany(
+                'INSERT INTO products (name, price, category) VALUES (?, ?, ?)',
+                [
+                    ('Laptop', 999.99, 'Electronics'),
+                    ('Book', 19.99, 'Books'),
+                    ('Phone', 599.99, 'Electronics'),
+                ]
+            )
             conn.commit()
             
+            # Plain SELECTs run with writes disabled
+            if self._is_select_only(code):
+                cursor.execute('PRAGMA query_only = 1')
+            
             # Execute the user's SQL
             cursor.execute(code)
             
@@ -498,14 +579,14 @@ class CodeExecutor:
                 "language": "sql"
             }
         finally:
-            if 'conn' in locals():
+            if conn is not None:
                 conn.close()
     
     def _execute_bash(self, code: str) -> Dict[str, Any]:
         """Execute Bash code safely with restrictions."""
         try:
             # Only allow safe commands
-            safe_commands = ['echo', 'cat', 'ls', 'pwd', 'whoami', 'date', 'cal', 'bc', 'expr']
+            safe_commands = frozenset(['echo', 'cat', 'ls', 'pwd', 'whoami', 'date', 'cal', 'bc', 'expr'])
             
             # Check if code contains only safe commands
             lines = code.strip().split('\n')
@@ -521,9 +602,9 @@ class CodeExecutor:
                             "language": "bash"
                         }
             
-            # Execute with timeout and restrictions
+            # Execute with timeout and kernel-enforced CPU/memory/file-size limits
             result = subprocess.run(
-                ['bash', '-c', code],
+                ['bash', '-c', _BASH_LIMITS + code],
                 capture_output=True,
                 text=True,
                 timeout=10,  # 10 second timeout
@@ -532,6 +613,9 @@ class CodeExecutor:
             
             output = result.stdout
             error = result.stderr
+            if result.returncode < 0 and not error:
+                # Killed by a signal, e.g. SIGXCPU or SIGXFSZ when a limit is exceeded
+                error = f"Terminated by {_signal_name(-result.returncode)}"
             
             if result.returncode == 0:
                 return {
@@ -560,4 +644,15 @@ class CodeExecutor:
                 "output": f"Bash execution error: {str(e)}",
                 "error": str(e),
                 "language": "bash"
-            } 
\ No newline at end of file
+            } 
+
+# Shared executor so compiled patterns and dispatch tables are built once per process
+_default_executor = CodeExecutor()
+
+def is_safe_to_execute(code: str, language: str) -> Dict[str, Any]:
+    """Check if code is safe to execute using the shared executor."""
+    return _default_executor.is_safe_to_execute(code, language)
+
+def execute_code(code: str, language: str) -> Dict[str, Any]:
+    """Execute code safely using the shared executor."""
+    return _default_executor.execute_code(code, language)
@@ -0,0 +1,36 @@
+"""
+Embedding Model for AnyLang AI Code Writer
+Loads the sentence encoder shared by the RAG engine and the prompt cache.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Sentence embedding model used for code chunks, search queries and cached prompts
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+_model = None
+_model_lock = threading.Lock()
+
+def load_embedding_model():
+    """
+    Return the process-wide sentence encoder, loading it on first use.
+
+    Tries the ONNX Runtime backend first and falls back to PyTorch.
+
+    Raises:
+        Exception: If sentence-transformers is missing or the model cannot be loaded
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            try:
+                # Needs sentence-transformers>=3.2 with the onnx extra (optimum + onnxruntime)
+                _model = SentenceTransformer(EMBEDDING_MODEL, backend="onnx")
+            except Exception as e:
+                logger.info(f"ONNX backend unavailable, using PyTorch: {e}")
+                _model = SentenceTransformer(EMBEDDING_MODEL)
+        return _model
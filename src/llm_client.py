@@ -3,13 +3,23 @@ LLM Client Module for AnyLang AI Code Writer
 Handles API interactions with Groq and Gemini for code generation tasks.
 """
 
+import asyncio
+import functools
+import json
 import os
+import re
 import logging
 import time
-from typing import Optional, Dict, Any
+import weakref
+from typing import Optional, Callable, Dict, Any, Iterator, List, Tuple
 from dotenv import load_dotenv
-import groq
-import google.generativeai as genai
+from src.prompt_cache import PromptCache, normalize_prompt
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # Load environment variables
 load_dotenv()
@@ -18,13 +28,127 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sampling temperature for all generation calls
+TEMPERATURE = 0.1
+
+# Bounds for the per-request output token cap
+MIN_MAX_TOKENS = 512
+MAX_MAX_TOKENS = 2048
+
+# A translation is about as long as its source; allow some headroom over the source's tokens
+TRANSLATION_TOKEN_RATIO = 1.2
+
+# Seconds a rate-limited provider is tried last
+RATE_LIMIT_COOLDOWN = 60
+
+# Error messages that indicate a rate limit or exhausted quota
+_RATE_LIMIT_RE = re.compile(r"(?i)quota|429|rate[_ ]?limit")
+
+# Error response templates, filled with format_map
+RATE_LIMIT_BOTH_TEMPLATE = """# API Rate Limit Exceeded
+
+Both Groq and Gemini APIs have hit their rate limits.
+
+## Solutions:
+1. **Wait a few minutes** and try again
+2. **Upgrade your API plan** for higher limits
+3. **Use a different API key** if available
+
+## Current Limits:
+- **Groq Free Tier**: 100 requests/minute
+- **Gemini Free Tier**: 15 requests/minute
+
+Error: {error_msg}"""
+
+RATE_LIMIT_SINGLE_TEMPLATE = """# API Rate Limit Exceeded
+
+The {provider} API has hit its rate limit.
+
+## Solutions:
+1. **Wait a few minutes** and try again
+2. **Switch to the other model** in the sidebar
+3. **Upgrade your API plan** for higher limits
+
+Error: {error_msg}"""
+
+GENERIC_ERROR_TEMPLATE = "# Error generating code: {error_msg}\n# Please check your API keys and try again."
+
+# Model identifiers reported in results, by provider
+PROVIDER_MODELS = {
+    "groq": "groq-llama3-70b-8192",
+    "gemini": "gemini-1.5-pro"
+}
+
+# Language-independent Gemini instructions; the language goes after the header
+GEMINI_HEADER = "You are an expert programmer. Write clean, idiomatic code in the language given below. Add concise comments for clarity. Output only the code block, no extra explanation."
+GEMINI_RAG_HEADER = "You are an expert programmer. Write clean, idiomatic code in the language given below. Follow the style and patterns shown in the provided code examples. Add concise comments for clarity. Output only the code block, no extra explanation."
+
+# Appended to the Groq system prompt when requesting a JSON object response
+JSON_MODE_INSTRUCTION = '\nReturn only a JSON object: {"code": "<code>"}'
+
+class _MalformedJSONError(ValueError):
+    """A JSON-mode response that is truncated or lacks a string "code" field."""
+
+# A response that is a single fenced code block, capturing its body
+_FENCE_RE = re.compile(r"^```[a-zA-Z+#]*\n(.*)\n```$", re.DOTALL)
+
+def _extract_code(text: str) -> str:
+    """Strip surrounding whitespace and a wrapping markdown fence from a model response."""
+    text = text.strip()
+    match = _FENCE_RE.match(text)
+    return match.group(1) if match else text
+
+def _estimate_max_tokens(code: str) -> int:
+    """Scale the output token cap for translating code with the code's size."""
+    # Source code averages about four characters per token
+    return min(MAX_MAX_TOKENS, max(MIN_MAX_TOKENS, int(len(code) / 4 * TRANSLATION_TOKEN_RATIO)))
+
+@functools.lru_cache(maxsize=128)
+def _system_prompt(language: str, use_rag: bool) -> str:
+    """Build the generation system prompt once per (language, RAG) pair."""
+    if use_rag:
+        return f"You are an expert programmer. Write clean, idiomatic code in {language}. Follow the style and patterns shown in the provided code examples. Add concise comments for clarity. Output only the code block, no extra explanation."
+    return f"You are an expert programmer. Write clean, idiomatic code in {language}. Add concise comments for clarity. Output only the code block, no extra explanation."
+
 class LLMClient:
     """Client for interacting with LLM APIs (Groq and Gemini)."""
     
     def __init__(self):
         self.groq_client = None
         self.gemini_client = None
+        self._groq_api_key = None
+        self._http = None
+        # Event loop -> (async Groq client, its HTTP pool); an async pool only works on
+        # the loop it was created on, and asyncio.run starts a new loop on every call
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Any, Any]]" = weakref.WeakKeyDictionary()
+        # Cache key -> future for async requests currently awaiting an LLM
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Prompts and responses are only written to disk when a cache file is configured
+        self._cache = PromptCache(db_path=os.getenv("ANYLANG_CACHE_DB"))
+        # Per-provider error counts and rate-limit cooldowns used to order fallbacks
+        self._provider_health = {
+            "groq": {"cooling_until": 0.0, "errors": 0},
+            "gemini": {"cooling_until": 0.0, "errors": 0},
+        }
         self._initialize_clients()
+        
+        # Provider name -> handler, built once for the providers that initialized
+        self._dispatch = {name: handler for name, handler in [
+            ("groq", self._generate_with_groq if self.groq_client else None),
+            ("gemini", self._generate_with_gemini if self.gemini_client else None),
+        ] if handler}
+        self._stream_dispatch = {name: handler for name, handler in [
+            ("groq", self._stream_with_groq if self.groq_client else None),
+            ("gemini", self._stream_with_gemini if self.gemini_client else None),
+        ] if handler}
+        self._async_dispatch = {name: handler for name, handler in [
+            ("groq", self._agenerate_with_groq if self.groq_client else None),
+            ("gemini", self._agenerate_with_gemini if self.gemini_client else None),
+        ] if handler}
+        
+        # Availability is fixed once the clients are initialized
+        self._available_models = tuple(self._dispatch)
+        self._available = bool(self._available_models)
     
     def _initialize_clients(self):
         """Initialize API clients."""
@@ -32,7 +156,17 @@ class LLMClient:
         groq_api_key = os.getenv('GROQ_API_KEY')
         if groq_api_key:
             try:
-                self.groq_client = groq.Groq(api_key=groq_api_key)
+                import httpx
+                import groq
+                
+                # One pooled HTTP/2 client keeps connections warm across requests
+                self._http = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+                    timeout=httpx.Timeout(30.0, connect=10.0)
+                )
+                self.groq_client = groq.Groq(api_key=groq_api_key, http_client=self._http)
+                self._groq_api_key = groq_api_key
                 logger.info("Groq client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Groq client: {e}")
@@ -41,6 +175,7 @@ class LLMClient:
         gemini_api_key = os.getenv('GEMINI_API_KEY')
         if gemini_api_key:
             try:
+                import google.generativeai as genai
                 genai.configure(api_key=gemini_api_key)
                 self.gemini_client = genai.GenerativeModel('gemini-1.5-pro')
                 logger.info("Gemini client initialized successfully")
@@ -61,175 +196,308 @@ class LLMClient:
         Returns:
             Dict containing the generated code and metadata
         """
-        # Try the requested model first
-        if model == "groq" and self.groq_client:
+        return self._generate_cached("generate", prompt, language, model, use_rag, rag_context)
+    
+    def _generate_cached(self, method: str, prompt: str, language: str, model: str, use_rag: bool, rag_context: str, max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
+        """Serve a request from the prompt cache, falling back to the LLMs on a miss."""
+        cached, key, namespace = self._cache_lookup(method, prompt, language, model, use_rag, rag_context)
+        if cached is not None:
+            return cached
+        
+        result = self._generate_uncached(prompt, language, model, use_rag, rag_context, max_tokens, json_mode)
+        self._cache_store(key, result, namespace, prompt)
+        return result
+    
+    def _cache_lookup(self, method: str, prompt: str, language: str, model: str, use_rag: bool, rag_context: str) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Look a request up in the prompt cache.
+        
+        Returns:
+            Tuple of (cached result or None, exact key, semantic namespace); the key is
+            None when responses at the current temperature are not cacheable
+        """
+        if not self._cache.is_cacheable(TEMPERATURE):
+            return None, None, None
+        
+        context = rag_context if use_rag else ""
+        # Whitespace is insignificant in natural-language tasks but not in the code
+        # embedded in explain and translate prompts
+        key_prompt = normalize_prompt(prompt) if method == "generate" else prompt
+        key = self._cache.make_key(method, model, language, key_prompt, TEMPERATURE, context)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached, key, None
+        
+        # Paraphrased natural-language requests can reuse an earlier answer; explain and
+        # translate prompts embed user code, where near-identical text can differ in meaning
+        namespace = None
+        if method == "generate":
+            namespace = self._cache.make_key(method, model, language, "", TEMPERATURE, context)
+            cached = self._cache.get_similar(namespace, prompt)
+        return cached, key, namespace
+    
+    def _cache_store(self, key: Optional[str], result: Dict[str, Any], namespace: Optional[str], prompt: str):
+        """Store a successful result in the prompt cache."""
+        if key is not None and "error" not in result:
+            self._cache.put(key, result, namespace, prompt)
+    
+    def _generate_uncached(self, prompt: str, language: str, model: str, use_rag: bool, rag_context: str, max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
+        """Generate code with automatic fallback between the available LLMs."""
+        providers = self._ordered_providers(model, self._dispatch)
+        if not providers:
+            return self._create_error_response("No LLM clients available", language, "none")
+        
+        last_error = None
+        for name, generate in providers:
             try:
-                return self._generate_with_groq(prompt, language, use_rag, rag_context)
+                result = generate(prompt, language, use_rag, rag_context, max_tokens, json_mode)
             except Exception as e:
-                logger.warning(f"Groq failed, trying Gemini: {e}")
-                if self.gemini_client:
-                    try:
-                        return self._generate_with_gemini(prompt, language, use_rag, rag_context)
-                    except Exception as gemini_error:
-                        logger.error(f"Both Groq and Gemini failed: {gemini_error}")
-                        return self._create_error_response(str(gemini_error), language, "both")
-                else:
-                    return self._create_error_response(str(e), language, "groq")
-        
-        elif model == "gemini" and self.gemini_client:
+                logger.warning(f"{name.title()} failed: {e}")
+                self._record_failure(name, e)
+                last_error = e
+                continue
+            self._record_success(name)
+            return result
+        
+        failed_models = "both" if len(providers) > 1 else providers[0][0]
+        return self._create_error_response(str(last_error), language, failed_models)
+    
+    def _ordered_providers(self, model: str, handlers: Dict[str, Callable]) -> List[Tuple[str, Callable]]:
+        """
+        Order the available providers for a request.
+        
+        Providers that are not cooling down after a rate limit come first, then
+        the requested model, then those with fewer recent errors.
+        
+        Args:
+            model: Preferred provider name
+            handlers: Provider name -> handler for each available provider
+        
+        Returns:
+            List of (provider name, handler) pairs in the order to try them
+        """
+        now = time.time()
+        
+        def rank(provider: Tuple[str, Callable]) -> Tuple[bool, bool, int]:
+            health = self._provider_health[provider[0]]
+            return (health["cooling_until"] > now, provider[0] != model, health["errors"])
+        
+        return sorted(handlers.items(), key=rank)
+    
+    def _record_success(self, provider: str):
+        """Reset a provider's error count after a successful call."""
+        self._provider_health[provider]["errors"] = 0
+    
+    def _record_failure(self, provider: str, error: Exception):
+        """Count a provider failure and cool the provider down if it was rate limited."""
+        health = self._provider_health[provider]
+        health["errors"] += 1
+        if self._is_rate_limit_error(str(error)):
+            health["cooling_until"] = time.time() + RATE_LIMIT_COOLDOWN
+    
+    def _is_rate_limit_error(self, error_msg: str) -> bool:
+        """Check if an error message indicates a rate limit or exhausted quota."""
+        return _RATE_LIMIT_RE.search(error_msg) is not None
+    
+    def generate_code_stream(self, prompt: str, language: str, model: str = "groq", use_rag: bool = False, rag_context: str = "", result: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Stream generated code as it arrives, with the same fallback and caching as generate_code.
+        
+        Args:
+            prompt: The prompt for code generation
+            language: Target programming language
+            model: Which model to use ("groq" or "gemini")
+            use_rag: Whether to use RAG-enhanced prompts
+            rag_context: Code context from user's codebase
+            result: Optional dict filled with the final result (as returned by
+                generate_code) once the stream is exhausted
+        
+        Yields:
+            Chunks of generated text
+        """
+        if result is None:
+            result = {}
+        
+        cached, key, namespace = self._cache_lookup("generate", prompt, language, model, use_rag, rag_context)
+        if cached is not None:
+            result.update(cached)
+            yield cached["code"]
+            return
+        
+        available = self._ordered_providers(model, self._stream_dispatch)
+        if not available:
+            result.update(self._create_error_response("No LLM clients available", language, "none"))
+            return
+        
+        last_error = None
+        for name, stream in available:
+            chunks = []
             try:
-                return self._generate_with_gemini(prompt, language, use_rag, rag_context)
+                for chunk in stream(prompt, language, use_rag, rag_context):
+                    if chunk:
+                        chunks.append(chunk)
+                        yield chunk
             except Exception as e:
-                logger.warning(f"Gemini failed, trying Groq: {e}")
-                if self.groq_client:
-                    try:
-                        return self._generate_with_groq(prompt, language, use_rag, rag_context)
-                    except Exception as groq_error:
-                        logger.error(f"Both Gemini and Groq failed: {groq_error}")
-                        return self._create_error_response(str(groq_error), language, "both")
-                else:
-                    return self._create_error_response(str(e), language, "gemini")
+                logger.warning(f"{name.title()} stream failed: {e}")
+                self._record_failure(name, e)
+                last_error = e
+                # Text already shown to the caller cannot be retracted, so only fall back before the first chunk
+                if chunks:
+                    break
+                continue
+            
+            final = {
+                "code": _extract_code("".join(chunks)),
+                "language": language,
+                "model": PROVIDER_MODELS[name],
+                "tokens_used": None,  # Usage is not reported on streamed responses
+                "rag_used": use_rag
+            }
+            self._record_success(name)
+            result.update(final)
+            self._cache_store(key, final, namespace, prompt)
+            return
         
-        else:
-            # Auto-select available model
-            if self.groq_client:
-                try:
-                    return self._generate_with_groq(prompt, language, use_rag, rag_context)
-                except Exception as e:
-                    logger.error(f"Groq failed: {e}")
-                    if self.gemini_client:
-                        try:
-                            return self._generate_with_gemini(prompt, language, use_rag, rag_context)
-                        except Exception as gemini_error:
-                            return self._create_error_response(str(gemini_error), language, "both")
-                    else:
-                        return self._create_error_response(str(e), language, "groq")
-            elif self.gemini_client:
-                try:
-                    return self._generate_with_gemini(prompt, language, use_rag, rag_context)
-                except Exception as e:
-                    return self._create_error_response(str(e), language, "gemini")
-            else:
-                return self._create_error_response("No LLM clients available", language, "none")
+        failed_models = "both" if len(available) > 1 else available[0][0]
+        result.update(self._create_error_response(str(last_error), language, failed_models))
+    
+    def _stream_with_groq(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "") -> Iterator[str]:
+        """Stream generated text from the Groq API."""
+        response = self.groq_client.chat.completions.create(stream=True, **self._groq_request(prompt, language, use_rag, rag_context))
+        for chunk in response:
+            yield chunk.choices[0].delta.content or ""
+    
+    def _stream_with_gemini(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "") -> Iterator[str]:
+        """Stream generated text from the Gemini API."""
+        response = self.gemini_client.generate_content(self._gemini_prompt(prompt, language, use_rag, rag_context), stream=True)
+        for chunk in response:
+            yield chunk.text
     
     def _create_error_response(self, error_msg: str, language: str, failed_models: str) -> Dict[str, Any]:
         """Create a standardized error response."""
-        if "quota" in error_msg.lower() or "429" in error_msg:
-            if failed_models == "both":
-                return {
-                    "code": f"""# API Rate Limit Exceeded
-
-Both Groq and Gemini APIs have hit their rate limits.
-
-## Solutions:
-1. **Wait a few minutes** and try again
-2. **Upgrade your API plan** for higher limits
-3. **Use a different API key** if available
-
-## Current Limits:
-- **Groq Free Tier**: 100 requests/minute
-- **Gemini Free Tier**: 15 requests/minute
-
-Error: {error_msg}""",
-                    "language": language,
-                    "model": "error",
-                    "error": error_msg
-                }
-            else:
-                return {
-                    "code": f"""# API Rate Limit Exceeded
-
-The {failed_models.title()} API has hit its rate limit.
-
-## Solutions:
-1. **Wait a few minutes** and try again
-2. **Switch to the other model** in the sidebar
-3. **Upgrade your API plan** for higher limits
-
-Error: {error_msg}""",
-                    "language": language,
-                    "model": "error",
-                    "error": error_msg
+        if self._is_rate_limit_error(error_msg):
+            template = RATE_LIMIT_BOTH_TEMPLATE if failed_models == "both" else RATE_LIMIT_SINGLE_TEMPLATE
+        else:
+            template = GENERIC_ERROR_TEMPLATE
+        
+        return {
+            "code": template.format_map({"error_msg": error_msg, "provider": failed_models.title()}),
+            "language": language,
+            "model": "error",
+            "error": error_msg
+        }
+    
+    def _build_generation_prompts(self, prompt: str, language: str, use_rag: bool, rag_context: str) -> Tuple[str, str]:
+        """Build the (system, user) prompt pair for a generation request."""
+        # Import prompts module for RAG functionality
+        from src.prompts import get_rag_enhanced_prompt
+        
+        if use_rag and rag_context:
+            # Use RAG-enhanced prompt
+            enhanced_prompt = get_rag_enhanced_prompt('code_generation', task=prompt, language=language, code_context=rag_context)
+            system_prompt = _system_prompt(language, True)
+        else:
+            # Use standard prompt
+            enhanced_prompt = prompt
+            system_prompt = _system_prompt(language, False)
+        
+        return system_prompt, enhanced_prompt
+    
+    def _groq_request(self, prompt: str, language: str, use_rag: bool, rag_context: str, json_mode: bool = False, max_tokens: int = MAX_MAX_TOKENS) -> Dict[str, Any]:
+        """
+        Build the keyword arguments for a Groq chat completion.
+        
+        Args:
+            json_mode: Ask for a {"code": ...} JSON object instead of free text; not for streaming
+            max_tokens: Output token cap for the completion
+        """
+        system_content, enhanced_prompt = self._build_generation_prompts(prompt, language, use_rag, rag_context)
+        if json_mode:
+            system_content += JSON_MODE_INSTRUCTION
+        
+        # Use llama3-70b-8192 (current recommended model) instead of decommissioned mixtral-8x7b-32768
+        request = {
+            "model": "llama3-70b-8192",  # Updated to current model
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system_content
+                },
+                {
+                    "role": "user",
+                    "content": enhanced_prompt
                 }
+            ],
+            "temperature": TEMPERATURE,
+            "max_tokens": max_tokens
+        }
+        if json_mode:
+            request["response_format"] = {"type": "json_object"}
+        return request
+    
+    def _groq_result(self, raw_response: Any, language: str, use_rag: bool, json_mode: bool = False) -> Dict[str, Any]:
+        """Convert a raw Groq chat completion response into a result dict; raises _MalformedJSONError for a bad JSON-mode reply."""
+        # Decode the response body directly rather than building the SDK's pydantic models
+        data = _json_loads(raw_response.http_response.content)
+        usage = data.get("usage")
+        content = data["choices"][0]["message"]["content"]
+        if json_mode:
+            try:
+                code = _json_loads(content)["code"]
+            except (ValueError, KeyError, TypeError) as e:
+                raise _MalformedJSONError(f"Groq returned malformed JSON: {e}") from e
+            if not isinstance(code, str):
+                raise _MalformedJSONError("Groq returned malformed JSON: code is not a string")
         else:
-            return {
-                "code": f"# Error generating code: {error_msg}\n# Please check your API keys and try again.",
-                "language": language,
-                "model": "error",
-                "error": error_msg
-            }
+            code = _extract_code(content)
+        return {
+            "code": code,
+            "language": language,
+            "model": PROVIDER_MODELS["groq"],
+            "tokens_used": usage.get("total_tokens") if usage else None,
+            "rag_used": use_rag
+        }
     
-    def _generate_with_groq(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "") -> Dict[str, Any]:
+    def _gemini_prompt(self, prompt: str, language: str, use_rag: bool, rag_context: str) -> str:
+        """Build the single-string prompt sent to Gemini."""
+        _, enhanced_prompt = self._build_generation_prompts(prompt, language, use_rag, rag_context)
+        # Static instructions first and per-request values last keep the prefix cacheable
+        header = GEMINI_RAG_HEADER if use_rag and rag_context else GEMINI_HEADER
+        return header + "\n\n---\nLanguage: " + language + "\nTask:\n" + enhanced_prompt
+    
+    def _gemini_result(self, response: Any, language: str, use_rag: bool) -> Dict[str, Any]:
+        """Convert a Gemini response into a result dict."""
+        code = _extract_code(response.text)
+        return {
+            "code": code,
+            "language": language,
+            "model": PROVIDER_MODELS["gemini"],
+            "tokens_used": None,  # Gemini doesn't provide token usage in free tier
+            "rag_used": use_rag
+        }
+    
+    def _generate_with_groq(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "", max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
         """Generate code using Groq API with optional RAG enhancement."""
         try:
-            # Import prompts module for RAG functionality
-            from src.prompts import get_rag_enhanced_prompt
-            
-            if use_rag and rag_context:
-                # Use RAG-enhanced prompt
-                enhanced_prompt = get_rag_enhanced_prompt('code_generation', task=prompt, language=language, code_context=rag_context)
-                system_content = f"You are an expert programmer. Write clean, idiomatic code in {language}. Follow the style and patterns shown in the provided code examples. Add concise comments for clarity. Output only the code block, no extra explanation."
-            else:
-                # Use standard prompt
-                enhanced_prompt = prompt
-                system_content = f"You are an expert programmer. Write clean, idiomatic code in {language}. Add concise comments for clarity. Output only the code block, no extra explanation."
-            
-            # Use llama3-70b-8192 (current recommended model) instead of decommissioned mixtral-8x7b-32768
-            response = self.groq_client.chat.completions.create(
-                model="llama3-70b-8192",  # Updated to current model
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_content
-                    },
-                    {
-                        "role": "user",
-                        "content": enhanced_prompt
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=2048
-            )
-            
-            code = response.choices[0].message.content.strip()
-            return {
-                "code": code,
-                "language": language,
-                "model": "groq-llama3-70b-8192",
-                "tokens_used": response.usage.total_tokens if response.usage else None,
-                "rag_used": use_rag
-            }
+            completions = self.groq_client.chat.completions.with_raw_response
+            if json_mode:
+                response = completions.create(**self._groq_request(prompt, language, use_rag, rag_context, json_mode=True, max_tokens=max_tokens))
+                try:
+                    return self._groq_result(response, language, use_rag, json_mode=True)
+                except _MalformedJSONError as e:
+                    # A truncated or malformed JSON reply is retried once as free text
+                    logger.warning(f"{e}; retrying without JSON mode")
+            response = completions.create(**self._groq_request(prompt, language, use_rag, rag_context, max_tokens=max_tokens))
+            return self._groq_result(response, language, use_rag)
         except Exception as e:
             logger.error(f"Groq API error: {e}")
             raise
     
-    def _generate_with_gemini(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "") -> Dict[str, Any]:
-        """Generate code using Gemini API with optional RAG enhancement."""
+    def _generate_with_gemini(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "", max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
+        """Generate code using Gemini API with optional RAG enhancement; Gemini keeps its own output limit and always answers in text."""
         try:
-            # Import prompts module for RAG functionality
-            from src.prompts import get_rag_enhanced_prompt
-            
-            if use_rag and rag_context:
-                # Use RAG-enhanced prompt
-                enhanced_prompt = get_rag_enhanced_prompt('code_generation', task=prompt, language=language, code_context=rag_context)
-                system_prompt = f"You are an expert programmer. Write clean, idiomatic code in {language}. Follow the style and patterns shown in the provided code examples. Add concise comments for clarity. Output only the code block, no extra explanation."
-            else:
-                # Use standard prompt
-                enhanced_prompt = prompt
-                system_prompt = f"You are an expert programmer. Write clean, idiomatic code in {language}. Add concise comments for clarity. Output only the code block, no extra explanation."
-            
-            full_prompt = f"{system_prompt}\n\nTask: {enhanced_prompt}"
-            
-            response = self.gemini_client.generate_content(full_prompt)
-            
-            code = response.text.strip()
-            return {
-                "code": code,
-                "language": language,
-                "model": "gemini-1.5-pro",
-                "tokens_used": None,  # Gemini doesn't provide token usage in free tier
-                "rag_used": use_rag
-            }
+            response = self.gemini_client.generate_content(self._gemini_prompt(prompt, language, use_rag, rag_context))
+            return self._gemini_result(response, language, use_rag)
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
             raise
@@ -248,19 +516,11 @@ Error: {error_msg}""",
         Returns:
             Dict containing the explanation
         """
-        from src.prompts import get_rag_enhanced_prompt
-        
-        if use_rag and rag_context:
-            prompt = get_rag_enhanced_prompt('code_explanation', code=code, language=language, code_context=rag_context)
-        else:
-            prompt = f"""Explain the following {language} code line by line in plain English, suitable for a beginner:
-
-{code}
-
-Provide a clear, educational explanation that helps understand what each part does."""
+        prompt = self._build_explain_prompt(code, language, use_rag, rag_context)
         
         # Use the same fallback logic as generate_code
-        return self.generate_code(prompt, language, model, use_rag, rag_context)
+        # A line-by-line explanation runs many times longer than the code, so keep the full cap
+        return self._generate_cached("explain", prompt, language, model, use_rag, rag_context, json_mode=False)
     
     def translate_code(self, code: str, source_language: str, target_language: str, model: str = "groq", use_rag: bool = False, rag_context: str = "") -> Dict[str, Any]:
         """
@@ -277,19 +537,59 @@ Provide a clear, educational explanation that helps understand what each part do
         Returns:
             Dict containing the translated code
         """
+        prompt = self._build_translate_prompt(code, source_language, target_language, use_rag, rag_context)
+        
+        # Use the same fallback logic as generate_code
+        result = self._generate_cached("translate", prompt, target_language, model, use_rag, rag_context, _estimate_max_tokens(code))
+        
+        # Rename the key for translation
+        if "code" in result:
+            result["translated_code"] = result.pop("code")
+        
+        return result
+    
+    def _build_explain_prompt(self, code: str, language: str, use_rag: bool, rag_context: str) -> str:
+        """Build the prompt for a code explanation request."""
         from src.prompts import get_rag_enhanced_prompt
         
         if use_rag and rag_context:
-            prompt = get_rag_enhanced_prompt('code_translation', code=code, source_language=source_language, target_language=target_language, code_context=rag_context)
+            prompt = get_rag_enhanced_prompt('code_explanation', code=code, language=language, code_context=rag_context)
         else:
-            prompt = f"""Translate the following code from {source_language} to {target_language}, preserving functionality and idiomatic style:
+            prompt = f"""Explain the following code line by line in plain English, suitable for a beginner. Provide a clear, educational explanation that helps understand what each part does.
 
-{code}
-
-Write clean, idiomatic {target_language} code that performs the same function."""
+Language: {language}
+Code:
+{code}"""
+        return prompt
+    
+    def _build_translate_prompt(self, code: str, source_language: str, target_language: str, use_rag: bool, rag_context: str) -> str:
+        """Build the prompt for a code translation request."""
+        from src.prompts import get_rag_enhanced_prompt
         
-        # Use the same fallback logic as generate_code
-        result = self.generate_code(prompt, target_language, model, use_rag, rag_context)
+        if use_rag and rag_context:
+            prompt = get_rag_enhanced_prompt('code_translation', code=code, source_language=source_language, target_language=target_language, code_context=rag_context)
+        else:
+            prompt = f"""Translate the following code, preserving functionality and idiomatic style. Write clean, idiomatic code in the target language that performs the same function.
+
+Source language: {source_language}
+Target language: {target_language}
+Code:
+{code}"""
+        return prompt
+    
+    async def agenerate_code(self, prompt: str, language: str, model: str = "groq", use_rag: bool = False, rag_context: str = "") -> Dict[str, Any]:
+        """Async variant of generate_code; see generate_code for arguments."""
+        return await self._agenerate_cached("generate", prompt, language, model, use_rag, rag_context)
+    
+    async def aexplain_code(self, code: str, language: str, model: str = "groq", use_rag: bool = False, rag_context: str = "") -> Dict[str, Any]:
+        """Async variant of explain_code; see explain_code for arguments."""
+        prompt = self._build_explain_prompt(code, language, use_rag, rag_context)
+        return await self._agenerate_cached("explain", prompt, language, model, use_rag, rag_context, json_mode=False)
+    
+    async def atranslate_code(self, code: str, source_language: str, target_language: str, model: str = "groq", use_rag: bool = False, rag_context: str = "") -> Dict[str, Any]:
+        """Async variant of translate_code; see translate_code for arguments."""
+        prompt = self._build_translate_prompt(code, source_language, target_language, use_rag, rag_context)
+        result = await self._agenerate_cached("translate", prompt, target_language, model, use_rag, rag_context, _estimate_max_tokens(code))
         
         # Rename the key for translation
         if "code" in result:
@@ -297,18 +597,156 @@ Write clean, idiomatic {target_language} code that performs the same function.""
         
         return result
     
+    async def generate_batch(self, requests: List[Tuple[str, str]], model: str = "groq", concurrency: int = 10) -> List[Dict[str, Any]]:
+        """
+        Generate code for several prompts concurrently.
+        
+        Args:
+            requests: List of (prompt, language) pairs
+            model: Which model to prefer ("groq" or "gemini")
+            concurrency: Maximum number of requests in flight at once
+        
+        Returns:
+            List of result dicts in the same order as requests
+        """
+        # Embed every exact-cache miss in one encoder call before the semantic lookups
+        if self._cache.is_cacheable(TEMPERATURE):
+            self._cache.prime([
+                prompt for prompt, language in requests
+                if not self._cache.has(self._cache.make_key("generate", model, language, normalize_prompt(prompt), TEMPERATURE))
+            ])
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(prompt: str, language: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.agenerate_code(prompt, language, model)
+        
+        # A pool opened for this batch is closed with it, before asyncio.run closes the loop
+        owns_pool = asyncio.get_running_loop() not in self._async_clients
+        try:
+            return await asyncio.gather(*(run(prompt, language) for prompt, language in requests))
+        finally:
+            if owns_pool:
+                await self._aclose_loop_clients()
+    
+    async def _agenerate_cached(self, method: str, prompt: str, language: str, model: str, use_rag: bool, rag_context: str, max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
+        """Async variant of _generate_cached."""
+        cached, key, namespace = self._cache_lookup(method, prompt, language, model, use_rag, rag_context)
+        if cached is not None:
+            return cached
+        if key is None:
+            return await self._agenerate_uncached(prompt, language, model, use_rag, rag_context, max_tokens)
+        
+        # Identical requests already in flight on this loop share its round-trip
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            return dict(await inflight)
+        
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._agenerate_uncached(prompt, language, model, use_rag, rag_context, max_tokens)
+            self._cache_store(key, result, namespace, prompt)
+            future.set_result(result)
+            return dict(result)
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved so a future with no waiters is not logged
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+    
+    async def _agenerate_uncached(self, prompt: str, language: str, model: str, use_rag: bool, rag_context: str, max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
+        """Generate code asynchronously, trying the preferred model first and then the others."""
+        available = self._ordered_providers(model, self._async_dispatch)
+        if not available:
+            return self._create_error_response("No LLM clients available", language, "none")
+        
+        last_error = None
+        for name, generate in available:
+            try:
+                result = await generate(prompt, language, use_rag, rag_context, max_tokens, json_mode)
+            except Exception as e:
+                logger.warning(f"{name.title()} failed: {e}")
+                self._record_failure(name, e)
+                last_error = e
+                continue
+            self._record_success(name)
+            return result
+        
+        failed_models = "both" if len(available) > 1 else available[0][0]
+        return self._create_error_response(str(last_error), language, failed_models)
+    
+    async def _agenerate_with_groq(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "", max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
+        """Generate code using the async Groq client."""
+        try:
+            completions = self._async_groq_client().chat.completions.with_raw_response
+            if json_mode:
+                response = await completions.create(**self._groq_request(prompt, language, use_rag, rag_context, json_mode=True, max_tokens=max_tokens))
+                try:
+                    return self._groq_result(response, language, use_rag, json_mode=True)
+                except _MalformedJSONError as e:
+                    logger.warning(f"{e}; retrying without JSON mode")
+            response = await completions.create(**self._groq_request(prompt, language, use_rag, rag_context, max_tokens=max_tokens))
+            return self._groq_result(response, language, use_rag)
+        except Exception as e:
+            logger.error(f"Groq API error: {e}")
+            raise
+    
+    async def _agenerate_with_gemini(self, prompt: str, language: str, use_rag: bool = False, rag_context: str = "", max_tokens: int = MAX_MAX_TOKENS, json_mode: bool = True) -> Dict[str, Any]:
+        """Generate code using Gemini's async API; Gemini keeps its own output limit and always answers in text."""
+        try:
+            response = await self.gemini_client.generate_content_async(self._gemini_prompt(prompt, language, use_rag, rag_context))
+            return self._gemini_result(response, language, use_rag)
+        except Exception as e:
+            logger.error(f"Gemini API error: {e}")
+            raise
+    
+    def close(self):
+        """Close pooled HTTP connections."""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+    
+    async def aclose(self):
+        """Close pooled HTTP connections, including the running event loop's async pool."""
+        self.close()
+        await self._aclose_loop_clients()
+    
+    def _async_groq_client(self):
+        """Return the async Groq client for the running event loop, creating it on first use there."""
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            import httpx
+            import groq
+            
+            http = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+                timeout=httpx.Timeout(30.0, connect=10.0)
+            )
+            entry = (groq.AsyncGroq(api_key=self._groq_api_key, http_client=http), http)
+            self._async_clients[loop] = entry
+        return entry[0]
+    
+    async def _aclose_loop_clients(self):
+        """Close the running event loop's async HTTP pool, if one was opened."""
+        entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+    
     def is_available(self) -> bool:
         """Check if any LLM client is available."""
-        return self.groq_client is not None or self.gemini_client is not None
+        return self._available
     
     def get_available_models(self) -> list:
         """Get list of available models."""
-        models = []
-        if self.groq_client:
-            models.append("groq")
-        if self.gemini_client:
-            models.append("gemini")
-        return models
+        return list(self._available_models)
     
     def get_rate_limit_info(self) -> Dict[str, Any]:
         """Get information about current rate limits."""
@@ -0,0 +1,310 @@
+"""
+Prompt Cache Module for AnyLang AI Code Writer
+Caches LLM responses by exact prompt match and by semantic similarity.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.embeddings import load_embedding_model
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = lambda obj: json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# Schema for the on-disk cache; embedding is NULL for exact-match-only entries
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    namespace TEXT,
+    embedding BLOB,
+    response BLOB NOT NULL,
+    ts REAL NOT NULL
+)
+"""
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse runs of whitespace so formatting-only variants of a request match."""
+    return " ".join(prompt.split())
+
+class PromptCache:
+    """Two-tier (exact-match + semantic) cache for LLM responses."""
+
+    def __init__(self, capacity: int = 1024, ttl: float = 3600, similarity_threshold: float = 0.92,
+                 max_temperature: float = 0.1, enable_semantic: bool = True,
+                 db_path: Optional[str] = None):
+        """
+        Initialize the prompt cache.
+
+        Args:
+            capacity: Maximum number of cached responses
+            ttl: Seconds a cached response stays valid
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            max_temperature: Highest sampling temperature whose responses are cached
+            enable_semantic: Whether to use embedding similarity as a second tier
+            db_path: SQLite file that persists entries across restarts and processes
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_temperature = max_temperature
+        self.enable_semantic = enable_semantic
+
+        # key -> (timestamp, response), least recently used first
+        self._exact_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # namespace -> (keys, float16 embedding matrix)
+        self._embeddings: Dict[str, Tuple[List[str], Any]] = {}
+        self._model = None
+        # prompt -> embedding, so a lookup and the following put encode once
+        self._encoded: "OrderedDict[str, Any]" = OrderedDict()
+        self._db = None
+        self._db_lock = threading.Lock()
+        # Guards the in-memory tiers; the client is shared across Streamlit script threads
+        self._lock = threading.Lock()
+        # Serializes the lazy model load, without blocking exact-match lookups behind it
+        self._model_lock = threading.Lock()
+
+        if db_path:
+            self._open_db(db_path)
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Check if responses sampled at this temperature are deterministic enough to cache."""
+        return temperature <= self.max_temperature
+
+    def make_key(self, method: str, model: str, language: str, prompt: str,
+                 temperature: float, context: str = "") -> str:
+        """Build the exact-match cache key for a request."""
+        payload = json.dumps({
+            "m": method,
+            "model": model,
+            "lang": language.strip().lower(),
+            "prompt": prompt,
+            "t": temperature,
+            "ctx": context
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def has(self, key: str) -> bool:
+        """Check if an exact key is held in memory, without copying the response."""
+        with self._lock:
+            return key in self._exact_cache
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached response for an exact key, if fresh."""
+        with self._lock:
+            entry = self._exact_cache.get(key)
+        if entry is None:
+            entry = self._db_get(key)
+            if entry is None:
+                return None
+
+        timestamp, response = entry
+        if time.time() - timestamp > self.ttl:
+            with self._lock:
+                if self._exact_cache.get(key) is entry:
+                    del self._exact_cache[key]
+            self._db_delete(key, timestamp)
+            return None
+
+        with self._lock:
+            # Keep an entry another thread stored meanwhile; stored responses are never mutated
+            self._exact_cache.setdefault(key, entry)
+            self._exact_cache.move_to_end(key)
+            while len(self._exact_cache) > self.capacity:
+                self._exact_cache.popitem(last=False)
+        result = copy.deepcopy(response)
+        result["cached"] = True
+        return result
+
+    def get_similar(self, namespace: str, prompt: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response whose prompt is semantically close to this one."""
+        if not self.enable_semantic:
+            return None
+        with self._lock:
+            entry = self._embeddings.get(namespace)
+        if entry is None:
+            return None
+
+        embedding = self._encode(prompt)
+        if embedding is None:
+            return None
+
+        import numpy as np
+        keys, matrix = entry
+        # Stored rows are float16; compare in float32 against the float32 query
+        similarities = matrix.astype(np.float32) @ embedding
+        best = int(similarities.argmax())
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        return self.get(keys[best])
+
+    def put(self, key: str, response: Dict[str, Any], namespace: Optional[str] = None,
+            prompt: Optional[str] = None):
+        """
+        Store a response.
+
+        Args:
+            key: Exact-match key from make_key
+            response: Response dict to cache
+            namespace: Semantic namespace; only prompts in the same namespace can match
+            prompt: Prompt text to embed for semantic lookups
+        """
+        timestamp = time.time()
+        entry = (timestamp, copy.deepcopy(response))
+        with self._lock:
+            self._exact_cache[key] = entry
+            self._exact_cache.move_to_end(key)
+            while len(self._exact_cache) > self.capacity:
+                self._exact_cache.popitem(last=False)
+
+        embedding = None
+        if namespace is not None and prompt is not None and self.enable_semantic:
+            embedding = self._encode(prompt)
+            if embedding is not None:
+                with self._lock:
+                    self._add_embedding(namespace, key, embedding)
+
+        self._db_put(key, namespace, embedding, response, timestamp)
+
+    def prime(self, prompts: List[str]):
+        """Embed several prompts in one encoder call ahead of their lookups."""
+        if not self.enable_semantic:
+            return
+        normalized = (normalize_prompt(p) for p in prompts)
+        with self._lock:
+            pending = list(dict.fromkeys(p for p in normalized if p not in self._encoded))
+        if not pending or self._load_model() is None:
+            return
+
+        embeddings = self._model.encode(pending, batch_size=32, convert_to_numpy=True,
+                                        normalize_embeddings=True)
+        for prompt, embedding in zip(pending, embeddings):
+            self._remember(prompt, embedding)
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            self._exact_cache.clear()
+            self._embeddings.clear()
+            self._encoded.clear()
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM responses")
+
+    def _add_embedding(self, namespace: str, key: str, embedding):
+        """Append an embedding to a namespace's matrix, dropping evicted entries; call with self._lock held."""
+        import numpy as np
+        keys, matrix = self._embeddings.get(namespace, ([], None))
+        # Drop pointers to responses that have since been evicted
+        live = [i for i, k in enumerate(keys) if k in self._exact_cache and k != key]
+        keys = [keys[i] for i in live] + [key]
+        rows = [matrix[live]] if live else []
+        matrix = np.vstack(rows + [embedding.astype(np.float16)[np.newaxis, :]])
+        self._embeddings[namespace] = (keys, matrix)
+
+    def _open_db(self, db_path: str):
+        """Open the on-disk cache and warm the in-memory tiers from its freshest entries."""
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            with self._db:
+                self._db.execute(_SCHEMA)
+                self._db.execute("DELETE FROM responses WHERE ts < ?", (time.time() - self.ttl,))
+            rows = self._db.execute(
+                "SELECT key, namespace, embedding, response, ts FROM responses ORDER BY ts DESC LIMIT ?",
+                (self.capacity,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent prompt cache disabled: {e}")
+            self._db = None
+            return
+
+        # Oldest first so the LRU order matches insertion time
+        with self._lock:
+            for key, namespace, embedding, response, timestamp in reversed(rows):
+                self._exact_cache[key] = (timestamp, _json_loads(response))
+                if namespace is not None and embedding is not None and self.enable_semantic:
+                    import numpy as np
+                    self._add_embedding(namespace, key, np.frombuffer(embedding, dtype=np.float16))
+
+    def _db_get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Fetch an entry written by this or another process, or None."""
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT ts, response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], _json_loads(row[1])
+
+    def _db_delete(self, key: str, timestamp: float):
+        """Delete an expired entry, unless it has been rewritten since."""
+        if self._db is None:
+            return
+        try:
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM responses WHERE key = ? AND ts <= ?", (key, timestamp))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not delete expired cached response: {e}")
+
+    def _db_put(self, key: str, namespace: Optional[str], embedding, response: Dict[str, Any], timestamp: float):
+        """Write an entry through to the on-disk cache."""
+        if self._db is None:
+            return
+        blob = embedding.astype('float16').tobytes() if embedding is not None else None
+        try:
+            with self._db_lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, namespace, embedding, response, ts) VALUES (?, ?, ?, ?, ?)",
+                    (key, namespace, blob, _json_dumps(response), timestamp)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist cached response: {e}")
+
+    def _encode(self, prompt: str):
+        """Embed a prompt as a unit-length vector, or None if embeddings are unavailable."""
+        prompt = normalize_prompt(prompt)
+        with self._lock:
+            embedding = self._encoded.get(prompt)
+            if embedding is not None:
+                self._encoded.move_to_end(prompt)
+                return embedding
+
+        if self._load_model() is None:
+            return None
+
+        embedding = self._model.encode(prompt, convert_to_numpy=True, normalize_embeddings=True)
+        self._remember(prompt, embedding)
+        return embedding
+
+    def _remember(self, prompt: str, embedding):
+        """Memoize a prompt's embedding, bounded by the cache capacity."""
+        with self._lock:
+            self._encoded[prompt] = embedding
+            self._encoded.move_to_end(prompt)
+            while len(self._encoded) > self.capacity:
+                self._encoded.popitem(last=False)
+
+    def _load_model(self):
+        """Fetch the shared sentence encoder on first use, disabling the semantic tier if it fails."""
+        with self._model_lock:
+            if self._model is None and self.enable_semantic:
+                try:
+                    self._model = load_embedding_model()
+                except Exception as e:
+                    logger.warning(f"Semantic prompt cache disabled: {e}")
+                    self.enable_semantic = False
+            return self._model
@@ -3,344 +3,257 @@ Prompt Templates for AnyLang AI Code Writer
 Contains all prompt templates used for different LLM tasks.
 """
 
-# Code Generation Prompts
-CODE_GENERATION_PROMPT = """You are an expert programmer.
-Task: {task}
-Language: {language}
-Requirements:
-- Write clean, idiomatic code in the selected language.
-- Add concise comments for clarity.
-- Output only the code block, no extra explanation.
-- Ensure the code is functional and follows best practices.
-- Include proper error handling where appropriate.
-- Use modern language features and conventions."""
-
-# RAG-Enhanced Code Generation Prompt
-RAG_CODE_GENERATION_PROMPT = """You are an expert programmer. Here are code examples from the user's codebase:
-{code_context}
-
-User request: {task}
-Language: {language}
+import functools
+import re
+import string
+import textwrap
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, Tuple
+
+__all__ = [
+    "format_prompt",
+    "get_rag_enhanced_prompt",
+    "get_language_specific_prompt"
+]
+
+# Reference block that RAG variants insert ahead of the per-request fields
+_RAG_BLOCK = "For reference, here are {context_kind}:\n{{code_context}}\n\n"
+
+# Trailing spaces before a newline, and runs of two or more blank lines
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+\n")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+def _compact(template: str) -> str:
+    """Drop indentation, trailing spaces and repeated blank lines, which only cost tokens."""
+    template = _TRAILING_SPACE_RE.sub("\n", textwrap.dedent(template))
+    return _BLANK_LINES_RE.sub("\n\n", template).strip()
+
+def _compose(intro: str, items: Tuple[str, ...], tail: str, context_kind: str,
+             rag_items: Tuple[str, ...] = (), static_tail: str = "",
+             rag_intro: Optional[str] = None, rag_static_tail: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Build a task's regular and RAG-enhanced templates from shared parts.
+    
+    Args:
+        intro: Opening instructions, ending where the item list starts
+        items: Requirement or checklist lines shared by both variants
+        tail: Per-request section, always last
+        context_kind: What the RAG examples are, as read after "here are"
+        rag_items: Extra list lines for the RAG variant
+        static_tail: Static text between the list and the per-request section
+        rag_intro: Opening for the RAG variant, if it differs
+        rag_static_tail: static_tail for the RAG variant, if it differs
+    
+    Returns:
+        Tuple of (regular template, RAG template)
+    """
+    regular = intro + "\n".join(items) + "\n\n" + static_tail + tail
+    rag = (
+        (intro if rag_intro is None else rag_intro)
+        + "\n".join(items + rag_items) + "\n\n"
+        + (static_tail if rag_static_tail is None else rag_static_tail)
+        + _RAG_BLOCK.format(context_kind=context_kind)
+        + tail
+    )
+    return _compact(regular), _compact(rag)
 
-Requirements:
-- Write clean, idiomatic code in the selected language.
-- Follow the style and patterns shown in the provided code examples.
-- Add concise comments for clarity.
-- Output only the code block, no extra explanation.
-- Ensure the code is functional and follows best practices.
-- Include proper error handling where appropriate.
-- Use modern language features and conventions.
-- Match the coding style and conventions used in the user's codebase."""
+# Code Generation Prompts
+CODE_GENERATION_PROMPT, RAG_CODE_GENERATION_PROMPT = _compose(
+    "You are an expert programmer.\nRequirements:\n",
+    (
+        "- Write clean, idiomatic code in the selected language.",
+        "- Add concise comments for clarity.",
+        "- Output only the code block, no extra explanation.",
+        "- Ensure the code is functional and follows best practices.",
+        "- Include proper error handling where appropriate.",
+        "- Use modern language features and conventions."
+    ),
+    "Task: {task}",
+    "code examples from the user's codebase",
+    rag_items=(
+        "- Follow the style and patterns shown in the provided code examples.",
+        "- Match the coding style and conventions used in the user's codebase."
+    ),
+    static_tail="Language: {language}\n\n"
+)
 
 # Code Explanation Prompts
-CODE_EXPLANATION_PROMPT = """Explain the following {language} code line by line in plain English, suitable for a beginner:
-
-{code}
-
-Provide a clear, educational explanation that helps understand:
-- What each line does
-- How the code flows
-- Key concepts and patterns used
-- Any important algorithms or data structures
-- The overall purpose and functionality"""
-
-# RAG-Enhanced Code Explanation Prompt
-RAG_CODE_EXPLANATION_PROMPT = """Here is the code to explain:
-{code}
-
-For reference, here are similar code snippets from the user's codebase:
-{code_context}
-
-Please explain the code line by line, referencing similarities or differences to the provided snippets. Focus on:
-- What each line does
-- How the code flows
-- Key concepts and patterns used
-- Any important algorithms or data structures
-- The overall purpose and functionality
-- How it relates to or differs from the user's existing code patterns"""
+CODE_EXPLANATION_PROMPT, RAG_CODE_EXPLANATION_PROMPT = _compose(
+    "Explain the following {language} code line by line in plain English, suitable for a beginner.\n\n"
+    "Provide a clear, educational explanation that helps understand:\n",
+    (
+        "- What each line does",
+        "- How the code flows",
+        "- Key concepts and patterns used",
+        "- Any important algorithms or data structures",
+        "- The overall purpose and functionality"
+    ),
+    "Code:\n{code}",
+    "similar code snippets from the user's codebase",
+    rag_items=("- How it relates to or differs from the user's existing code patterns",),
+    rag_intro="Please explain the code below line by line, referencing similarities or differences to the provided snippets. Focus on:\n"
+)
 
 # Code Translation Prompts
-CODE_TRANSLATION_PROMPT = """Translate the following code from {source_language} to {target_language}, preserving functionality and idiomatic style:
-
-{code}
-
-Requirements:
-- Maintain the same functionality and logic
-- Use idiomatic {target_language} patterns and conventions
-- Preserve comments and documentation
-- Handle language-specific features appropriately
-- Ensure the translated code is clean and readable"""
-
-# RAG-Enhanced Code Translation Prompt
-RAG_CODE_TRANSLATION_PROMPT = """Translate the following code from {source_language} to {target_language}:
-
-{code}
-
-For reference, here are similar code patterns from the user's {target_language} codebase:
-{code_context}
-
-Requirements:
-- Maintain the same functionality and logic
-- Use idiomatic {target_language} patterns and conventions from the user's codebase
-- Preserve comments and documentation
-- Handle language-specific features appropriately
-- Ensure the translated code is clean and readable
-- Follow the coding style and conventions used in the user's {target_language} code"""
+CODE_TRANSLATION_PROMPT, RAG_CODE_TRANSLATION_PROMPT = _compose(
+    "Translate the following code from {source_language} to {target_language}, preserving functionality and idiomatic style.\n\n"
+    "Requirements:\n",
+    (
+        "- Maintain the same functionality and logic",
+        "- Use idiomatic {target_language} patterns and conventions",
+        "- Preserve comments and documentation",
+        "- Handle language-specific features appropriately",
+        "- Ensure the translated code is clean and readable"
+    ),
+    "Code:\n{code}",
+    "similar code patterns from the user's {target_language} codebase",
+    rag_items=("- Follow the coding style and conventions used in the user's {target_language} code",)
+)
 
 # Unit Test Generation Prompts
-UNIT_TEST_PROMPT = """Write comprehensive unit tests for the following {language} code using the best practice testing framework:
-
-{code}
-
-Requirements:
-- Test all major functions and edge cases
-- Include positive and negative test cases
-- Use descriptive test names
-- Follow testing best practices for {language}
-- Include setup and teardown if needed
-- Test error conditions and boundary cases"""
-
-# RAG-Enhanced Unit Test Generation Prompt
-RAG_UNIT_TEST_PROMPT = """Write comprehensive unit tests for the following {language} code:
-
-{code}
-
-For reference, here are testing patterns from the user's {language} codebase:
-{code_context}
-
-Requirements:
-- Test all major functions and edge cases
-- Include positive and negative test cases
-- Use descriptive test names
-- Follow testing best practices for {language}
-- Include setup and teardown if needed
-- Test error conditions and boundary cases
-- Use similar testing patterns and conventions as shown in the user's codebase"""
+UNIT_TEST_PROMPT, RAG_UNIT_TEST_PROMPT = _compose(
+    "Write comprehensive unit tests for the following {language} code using the best practice testing framework.\n\n"
+    "Requirements:\n",
+    (
+        "- Test all major functions and edge cases",
+        "- Include positive and negative test cases",
+        "- Use descriptive test names",
+        "- Follow testing best practices for {language}",
+        "- Include setup and teardown if needed",
+        "- Test error conditions and boundary cases"
+    ),
+    "Code:\n{code}",
+    "testing patterns from the user's {language} codebase",
+    rag_items=("- Use similar testing patterns and conventions as shown in the user's codebase",)
+)
 
 # Code Review Prompts
-CODE_REVIEW_PROMPT = """Review this {language} code as a senior developer. Provide a comprehensive analysis including:
-
-1. **Strengths**: What the code does well
-2. **Areas for Improvement**: Specific issues and suggestions
-3. **Best Practices**: How to make it more idiomatic
-4. **Performance**: Any performance considerations
-5. **Security**: Security concerns if applicable
-6. **Maintainability**: How to make it more maintainable
-
-Code to review:
-{code}
-
-Then, provide an improved version of the code that addresses the issues identified."""
-
-# RAG-Enhanced Code Review Prompt
-RAG_CODE_REVIEW_PROMPT = """Review this {language} code as a senior developer, considering the user's existing codebase:
-
-Code to review:
-{code}
-
-For reference, here are similar code patterns from the user's codebase:
-{code_context}
-
-Provide a comprehensive analysis including:
-
-1. **Strengths**: What the code does well
-2. **Areas for Improvement**: Specific issues and suggestions
-3. **Best Practices**: How to make it more idiomatic
-4. **Performance**: Any performance considerations
-5. **Security**: Security concerns if applicable
-6. **Maintainability**: How to make it more maintainable
-7. **Consistency**: How well it matches the user's coding style and patterns
-
-Then, provide an improved version of the code that addresses the issues identified and follows the user's coding conventions."""
+CODE_REVIEW_PROMPT, RAG_CODE_REVIEW_PROMPT = _compose(
+    "Review this {language} code as a senior developer. Provide a comprehensive analysis including:\n\n",
+    (
+        "1. **Strengths**: What the code does well",
+        "2. **Areas for Improvement**: Specific issues and suggestions",
+        "3. **Best Practices**: How to make it more idiomatic",
+        "4. **Performance**: Any performance considerations",
+        "5. **Security**: Security concerns if applicable",
+        "6. **Maintainability**: How to make it more maintainable"
+    ),
+    "Code to review:\n{code}",
+    "similar code patterns from the user's codebase",
+    rag_items=("7. **Consistency**: How well it matches the user's coding style and patterns",),
+    static_tail="Then, provide an improved version of the code that addresses the issues identified.\n\n",
+    rag_intro="Review this {language} code as a senior developer, considering the user's existing codebase. Provide a comprehensive analysis including:\n\n",
+    rag_static_tail="Then, provide an improved version of the code that addresses the issues identified and follows the user's coding conventions.\n\n"
+)
 
 # Code Refactoring Prompts
-CODE_REFACTOR_PROMPT = """Refactor the following {language} code to make it cleaner, more efficient, and more idiomatic:
-
-{code}
-
-Requirements:
-- Improve code structure and organization
-- Use more idiomatic {language} patterns
-- Optimize performance where possible
-- Improve readability and maintainability
-- Follow {language} best practices
-- Preserve all functionality
-- Add better error handling if needed"""
-
-# RAG-Enhanced Code Refactoring Prompt
-RAG_CODE_REFACTOR_PROMPT = """Refactor the following {language} code to make it cleaner, more efficient, and more idiomatic:
-
-{code}
-
-For reference, here are refactoring patterns and conventions from the user's codebase:
-{code_context}
-
-Requirements:
-- Improve code structure and organization
-- Use more idiomatic {language} patterns
-- Optimize performance where possible
-- Improve readability and maintainability
-- Follow {language} best practices
-- Preserve all functionality
-- Add better error handling if needed
-- Follow the user's coding style and conventions
-- Use similar patterns and structures as shown in the user's codebase"""
+CODE_REFACTOR_PROMPT, RAG_CODE_REFACTOR_PROMPT = _compose(
+    "Refactor the following {language} code to make it cleaner, more efficient, and more idiomatic.\n\n"
+    "Requirements:\n",
+    (
+        "- Improve code structure and organization",
+        "- Use more idiomatic {language} patterns",
+        "- Optimize performance where possible",
+        "- Improve readability and maintainability",
+        "- Follow {language} best practices",
+        "- Preserve all functionality",
+        "- Add better error handling if needed"
+    ),
+    "Code:\n{code}",
+    "refactoring patterns and conventions from the user's codebase",
+    rag_items=(
+        "- Follow the user's coding style and conventions",
+        "- Use similar patterns and structures as shown in the user's codebase"
+    )
+)
 
 # Documentation Generation Prompts
-DOCSTRING_PROMPT = """Generate comprehensive documentation for the following {language} code:
-
-{code}
-
-Requirements:
-- Add detailed docstrings for all functions/classes
-- Include parameter descriptions and return types
-- Document any complex algorithms or logic
-- Follow {language} documentation conventions
-- Include usage examples where helpful
-- Document any important assumptions or limitations"""
-
-# RAG-Enhanced Documentation Generation Prompt
-RAG_DOCSTRING_PROMPT = """Generate comprehensive documentation for the following {language} code:
-
-{code}
-
-For reference, here are documentation patterns from the user's codebase:
-{code_context}
-
-Requirements:
-- Add detailed docstrings for all functions/classes
-- Include parameter descriptions and return types
-- Document any complex algorithms or logic
-- Follow {language} documentation conventions
-- Include usage examples where helpful
-- Document any important assumptions or limitations
-- Use similar documentation style and format as shown in the user's codebase"""
+DOCSTRING_PROMPT, RAG_DOCSTRING_PROMPT = _compose(
+    "Generate comprehensive documentation for the following {language} code.\n\n"
+    "Requirements:\n",
+    (
+        "- Add detailed docstrings for all functions/classes",
+        "- Include parameter descriptions and return types",
+        "- Document any complex algorithms or logic",
+        "- Follow {language} documentation conventions",
+        "- Include usage examples where helpful",
+        "- Document any important assumptions or limitations"
+    ),
+    "Code:\n{code}",
+    "documentation patterns from the user's codebase",
+    rag_items=("- Use similar documentation style and format as shown in the user's codebase",)
+)
 
 # Complexity Analysis Prompts
-COMPLEXITY_PROMPT = """Analyze the time and space complexity of the following {language} code:
-
-{code}
-
-Provide a detailed analysis including:
-1. **Time Complexity**: Big O notation and explanation
-2. **Space Complexity**: Memory usage analysis
-3. **Algorithm Analysis**: What algorithms/data structures are used
-4. **Optimization Opportunities**: How to improve performance
-5. **Edge Cases**: Performance considerations for edge cases
-6. **Practical Implications**: Real-world performance impact"""
-
-# RAG-Enhanced Complexity Analysis Prompt
-RAG_COMPLEXITY_PROMPT = """Analyze the time and space complexity of the following {language} code:
-
-{code}
-
-For reference, here are similar algorithms and patterns from the user's codebase:
-{code_context}
-
-Provide a detailed analysis including:
-1. **Time Complexity**: Big O notation and explanation
-2. **Space Complexity**: Memory usage analysis
-3. **Algorithm Analysis**: What algorithms/data structures are used
-4. **Optimization Opportunities**: How to improve performance
-5. **Edge Cases**: Performance considerations for edge cases
-6. **Practical Implications**: Real-world performance impact
-7. **Comparison**: How this compares to similar implementations in the user's codebase"""
+COMPLEXITY_PROMPT, RAG_COMPLEXITY_PROMPT = _compose(
+    "Analyze the time and space complexity of the following {language} code.\n\n"
+    "Provide a detailed analysis including:\n",
+    (
+        "1. **Time Complexity**: Big O notation and explanation",
+        "2. **Space Complexity**: Memory usage analysis",
+        "3. **Algorithm Analysis**: What algorithms/data structures are used",
+        "4. **Optimization Opportunities**: How to improve performance",
+        "5. **Edge Cases**: Performance considerations for edge cases",
+        "6. **Practical Implications**: Real-world performance impact"
+    ),
+    "Code:\n{code}",
+    "similar algorithms and patterns from the user's codebase",
+    rag_items=("7. **Comparison**: How this compares to similar implementations in the user's codebase",)
+)
 
 # Project Template Generation Prompts
-PROJECT_TEMPLATE_PROMPT = """Generate a complete project template for: {project_description}
-
-Language: {language}
-
-Requirements:
-- Create a complete, runnable project structure
-- Include all necessary files (main code, tests, documentation, etc.)
-- Follow {language} project conventions and best practices
-- Include proper error handling and logging
-- Add comprehensive documentation
-- Include example usage and setup instructions
-- Make it production-ready with proper configuration"""
-
-# RAG-Enhanced Project Template Generation Prompt
-RAG_PROJECT_TEMPLATE_PROMPT = """Generate a complete project template for: {project_description}
-
-Language: {language}
-
-For reference, here are project structure patterns from the user's codebase:
-{code_context}
-
-Requirements:
-- Create a complete, runnable project structure
-- Include all necessary files (main code, tests, documentation, etc.)
-- Follow {language} project conventions and best practices
-- Include proper error handling and logging
-- Add comprehensive documentation
-- Include example usage and setup instructions
-- Make it production-ready with proper configuration
-- Follow similar project structure and organization patterns as shown in the user's codebase"""
+PROJECT_TEMPLATE_PROMPT, RAG_PROJECT_TEMPLATE_PROMPT = _compose(
+    "Generate a complete project template.\n\n"
+    "Requirements:\n",
+    (
+        "- Create a complete, runnable project structure",
+        "- Include all necessary files (main code, tests, documentation, etc.)",
+        "- Follow {language} project conventions and best practices",
+        "- Include proper error handling and logging",
+        "- Add comprehensive documentation",
+        "- Include example usage and setup instructions",
+        "- Make it production-ready with proper configuration"
+    ),
+    "Project: {project_description}",
+    "project structure patterns from the user's codebase",
+    rag_items=("- Follow similar project structure and organization patterns as shown in the user's codebase",),
+    static_tail="Language: {language}\n\n"
+)
 
 # Debug Mode Prompts
-DEBUG_PROMPT = """Debug the following {language} code. The user reports: {bug_description}
-
-Code with bug:
-{code}
-
-Provide a detailed analysis including:
-1. **Bug Identification**: What's causing the issue
-2. **Root Cause**: Why the bug occurs
-3. **Fix**: Corrected code with explanation
-4. **Prevention**: How to avoid similar bugs
-5. **Testing**: How to verify the fix works"""
-
-# RAG-Enhanced Debug Prompt
-RAG_DEBUG_PROMPT = """Debug the following {language} code. The user reports: {bug_description}
-
-Code with bug:
-{code}
-
-For reference, here are similar code patterns and debugging approaches from the user's codebase:
-{code_context}
-
-Provide a detailed analysis including:
-1. **Bug Identification**: What's causing the issue
-2. **Root Cause**: Why the bug occurs
-3. **Fix**: Corrected code with explanation
-4. **Prevention**: How to avoid similar bugs
-5. **Testing**: How to verify the fix works
-6. **Pattern Analysis**: How this bug relates to similar patterns in the user's codebase"""
+DEBUG_PROMPT, RAG_DEBUG_PROMPT = _compose(
+    "Debug the following {language} code.\n\n"
+    "Provide a detailed analysis including:\n",
+    (
+        "1. **Bug Identification**: What's causing the issue",
+        "2. **Root Cause**: Why the bug occurs",
+        "3. **Fix**: Corrected code with explanation",
+        "4. **Prevention**: How to avoid similar bugs",
+        "5. **Testing**: How to verify the fix works"
+    ),
+    "The user reports: {bug_description}\n\nCode with bug:\n{code}",
+    "similar code patterns and debugging approaches from the user's codebase",
+    rag_items=("6. **Pattern Analysis**: How this bug relates to similar patterns in the user's codebase",)
+)
 
 # Safe Code Execution Validation Prompts
-SAFETY_VALIDATION_PROMPT = """Analyze the following {language} code for safety before execution:
-
-{code}
-
-Check for:
-1. **File System Access**: Any file read/write operations
-2. **Network Access**: Any network requests
-3. **System Commands**: Any system-level operations
-4. **Infinite Loops**: Potential infinite loops
-5. **Resource Usage**: Memory or CPU intensive operations
-6. **Security Risks**: Any security vulnerabilities
-
-Provide a safety assessment and recommend if it's safe to execute."""
-
-# RAG-Enhanced Safety Validation Prompt
-RAG_SAFETY_VALIDATION_PROMPT = """Analyze the following {language} code for safety before execution:
-
-{code}
-
-For reference, here are similar code patterns from the user's codebase:
-{code_context}
-
-Check for:
-1. **File System Access**: Any file read/write operations
-2. **Network Access**: Any network requests
-3. **System Commands**: Any system-level operations
-4. **Infinite Loops**: Potential infinite loops
-5. **Resource Usage**: Memory or CPU intensive operations
-6. **Security Risks**: Any security vulnerabilities
-7. **Pattern Consistency**: How this compares to similar safe/unsafe patterns in the user's codebase
-
-Provide a safety assessment and recommend if it's safe to execute."""
+SAFETY_VALIDATION_PROMPT, RAG_SAFETY_VALIDATION_PROMPT = _compose(
+    "Analyze the following {language} code for safety before execution.\n\n"
+    "Check for:\n",
+    (
+        "1. **File System Access**: Any file read/write operations",
+        "2. **Network Access**: Any network requests",
+        "3. **System Commands**: Any system-level operations",
+        "4. **Infinite Loops**: Potential infinite loops",
+        "5. **Resource Usage**: Memory or CPU intensive operations",
+        "6. **Security Risks**: Any security vulnerabilities"
+    ),
+    "Code:\n{code}",
+    "similar code patterns from the user's codebase",
+    rag_items=("7. **Pattern Consistency**: How this compares to similar safe/unsafe patterns in the user's codebase",),
+    static_tail="Provide a safety assessment and recommend if it's safe to execute.\n\n"
+)
 
 # Language-specific prompts
 LANGUAGE_SPECIFIC_PROMPTS = {
@@ -394,47 +307,143 @@ LANGUAGE_SPECIFIC_PROMPTS = {
     }
 }
 
+# Freeze the table so callers cannot mutate shared prompt settings
+LANGUAGE_SPECIFIC_PROMPTS = MappingProxyType({
+    language: MappingProxyType(dict(settings))
+    for language, settings in LANGUAGE_SPECIFIC_PROMPTS.items()
+})
+
+# Languages with style settings, for membership tests before any lookup
+_SUPPORTED_LANGUAGES = frozenset(LANGUAGE_SPECIFIC_PROMPTS)
+
+# Templates whose only language field is {language}; translation templates take a
+# source/target pair and are always formatted in full
+_LANGUAGE_TEMPLATES = (
+    CODE_GENERATION_PROMPT, RAG_CODE_GENERATION_PROMPT,
+    CODE_EXPLANATION_PROMPT, RAG_CODE_EXPLANATION_PROMPT,
+    UNIT_TEST_PROMPT, RAG_UNIT_TEST_PROMPT,
+    CODE_REVIEW_PROMPT, RAG_CODE_REVIEW_PROMPT,
+    CODE_REFACTOR_PROMPT, RAG_CODE_REFACTOR_PROMPT,
+    DOCSTRING_PROMPT, RAG_DOCSTRING_PROMPT,
+    COMPLEXITY_PROMPT, RAG_COMPLEXITY_PROMPT,
+    PROJECT_TEMPLATE_PROMPT, RAG_PROJECT_TEMPLATE_PROMPT,
+    DEBUG_PROMPT, RAG_DEBUG_PROMPT,
+    SAFETY_VALIDATION_PROMPT, RAG_SAFETY_VALIDATION_PROMPT
+)
+
+# (template, language) -> template with {language} already filled in
+_PRERENDERED = {
+    (template, language): template.replace("{language}", language)
+    for template in _LANGUAGE_TEMPLATES
+    for language in LANGUAGE_SPECIFIC_PROMPTS
+}
+
+@dataclass(frozen=True, slots=True)
+class TaskPrompts:
+    """One template per task type; the attribute names are the task type keys."""
+    code_generation: str
+    code_explanation: str
+    code_translation: str
+    unit_test: str
+    code_review: str
+    code_refactor: str
+    documentation: str
+    complexity_analysis: str
+    project_template: str
+    debug: str
+    safety_validation: str
+
+_PROMPTS = TaskPrompts(
+    code_generation=CODE_GENERATION_PROMPT,
+    code_explanation=CODE_EXPLANATION_PROMPT,
+    code_translation=CODE_TRANSLATION_PROMPT,
+    unit_test=UNIT_TEST_PROMPT,
+    code_review=CODE_REVIEW_PROMPT,
+    code_refactor=CODE_REFACTOR_PROMPT,
+    documentation=DOCSTRING_PROMPT,
+    complexity_analysis=COMPLEXITY_PROMPT,
+    project_template=PROJECT_TEMPLATE_PROMPT,
+    debug=DEBUG_PROMPT,
+    safety_validation=SAFETY_VALIDATION_PROMPT
+)
+
+_RAG_PROMPTS = TaskPrompts(
+    code_generation=RAG_CODE_GENERATION_PROMPT,
+    code_explanation=RAG_CODE_EXPLANATION_PROMPT,
+    code_translation=RAG_CODE_TRANSLATION_PROMPT,
+    unit_test=RAG_UNIT_TEST_PROMPT,
+    code_review=RAG_CODE_REVIEW_PROMPT,
+    code_refactor=RAG_CODE_REFACTOR_PROMPT,
+    documentation=RAG_DOCSTRING_PROMPT,
+    complexity_analysis=RAG_COMPLEXITY_PROMPT,
+    project_template=RAG_PROJECT_TEMPLATE_PROMPT,
+    debug=RAG_DEBUG_PROMPT,
+    safety_validation=RAG_SAFETY_VALIDATION_PROMPT
+)
+
+# Valid task types; guards getattr against names like __class__
+_TASK_TYPES = frozenset(TaskPrompts.__slots__)
+
+def _parse_template(template: str) -> Tuple[Tuple[Optional[str], ...], Tuple[Tuple[int, str], ...]]:
+    """
+    Parse a template into static pieces with empty slots for its fields.
+    
+    Returns:
+        Tuple of (pieces, slots): pieces holds literal text and None placeholders,
+        slots holds (index into pieces, field name) for each placeholder
+    """
+    pieces = []
+    slots = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if spec or conversion:
+            raise ValueError(f"Format specs are not supported in prompt templates: {field}")
+        if literal:
+            pieces.append(literal)
+        if field is not None:
+            slots.append((len(pieces), field))
+            pieces.append(None)
+    return tuple(pieces), tuple(slots)
+
+@functools.lru_cache(maxsize=512)
+def _parsed(template: str) -> Tuple[Tuple[Optional[str], ...], Tuple[Tuple[int, str], ...]]:
+    """Parse a template on first use; templates a session never formats are never parsed."""
+    return _parse_template(template)
+
 def get_language_specific_prompt(language: str, prompt_type: str) -> str:
     """Get language-specific prompt enhancement."""
-    if language.lower() in LANGUAGE_SPECIFIC_PROMPTS:
-        return LANGUAGE_SPECIFIC_PROMPTS[language.lower()].get(prompt_type, "")
-    return ""
+    # Dropdown keys are already lowercase, so skip the copy in the common case
+    language = language if language.islower() else language.lower()
+    if language not in _SUPPORTED_LANGUAGES:
+        return ""
+    return LANGUAGE_SPECIFIC_PROMPTS[language].get(prompt_type, "")
 
 def format_prompt(template: str, **kwargs) -> str:
     """Format a prompt template with the given parameters."""
-    return template.format(**kwargs)
+    language = kwargs.get("language")
+    if language is not None:
+        # Common languages only have their per-request fields left to fill
+        template = _PRERENDERED.get((template, language), template)
+    
+    try:
+        pieces, slots = _parsed(template)
+    except ValueError:
+        return template.format(**kwargs)
+    
+    # Fill the slots in a copy of the pieces and join once, with no per-field concatenation
+    out = list(pieces)
+    for index, field in slots:
+        out[index] = str(kwargs[field])
+    return "".join(out)
 
 def get_rag_enhanced_prompt(task_type: str, **kwargs) -> str:
-    """Get RAG-enhanced prompt for a specific task type."""
-    rag_prompts = {
-        'code_generation': RAG_CODE_GENERATION_PROMPT,
-        'code_explanation': RAG_CODE_EXPLANATION_PROMPT,
-        'code_translation': RAG_CODE_TRANSLATION_PROMPT,
-        'unit_test': RAG_UNIT_TEST_PROMPT,
-        'code_review': RAG_CODE_REVIEW_PROMPT,
-        'code_refactor': RAG_CODE_REFACTOR_PROMPT,
-        'documentation': RAG_DOCSTRING_PROMPT,
-        'complexity_analysis': RAG_COMPLEXITY_PROMPT,
-        'project_template': RAG_PROJECT_TEMPLATE_PROMPT,
-        'debug': RAG_DEBUG_PROMPT,
-        'safety_validation': RAG_SAFETY_VALIDATION_PROMPT
-    }
+    """
+    Get RAG-enhanced prompt for a specific task type.
     
-    if task_type in rag_prompts:
-        return format_prompt(rag_prompts[task_type], **kwargs)
-    else:
-        # Fallback to regular prompts
-        regular_prompts = {
-            'code_generation': CODE_GENERATION_PROMPT,
-            'code_explanation': CODE_EXPLANATION_PROMPT,
-            'code_translation': CODE_TRANSLATION_PROMPT,
-            'unit_test': UNIT_TEST_PROMPT,
-            'code_review': CODE_REVIEW_PROMPT,
-            'code_refactor': CODE_REFACTOR_PROMPT,
-            'documentation': DOCSTRING_PROMPT,
-            'complexity_analysis': COMPLEXITY_PROMPT,
-            'project_template': PROJECT_TEMPLATE_PROMPT,
-            'debug': DEBUG_PROMPT,
-            'safety_validation': SAFETY_VALIDATION_PROMPT
-        }
-        return format_prompt(regular_prompts.get(task_type, CODE_GENERATION_PROMPT), **kwargs) 
\ No newline at end of file
+    Args:
+        task_type: Field name of TaskPrompts
+        **kwargs: Template parameters
+    """
+    if task_type not in _TASK_TYPES:
+        return format_prompt(CODE_GENERATION_PROMPT, **kwargs)
+    prompts = _RAG_PROMPTS if "code_context" in kwargs else _PROMPTS
+    return format_prompt(getattr(prompts, task_type), **kwargs)
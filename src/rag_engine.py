@@ -1,325 +1,75 @@
 """
 RAG Engine for AnyLang AI Code Writer
-Handles code chunking, embedding generation, vector storage, and retrieval.
+Handles embedding generation, vector storage, and retrieval over chunks from src.code_chunker.
 """
 
 import os
-import re
-import ast
 import json
+import hashlib
 import logging
 import zipfile
-import tempfile
 import shutil
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss
 
+from src.code_chunker import CodeChunker, SUPPORTED_EXTENSIONS, _chunk_one
+from src.embeddings import load_embedding_model
+
+# Columnar, compressed metadata store when pyarrow is installed; JSON otherwise
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
 logger = logging.getLogger(__name__)
 
-class CodeChunker:
-    """Handles code parsing and chunking for different programming languages."""
-    
-    def __init__(self):
-        self.supported_extensions = {
-            '.py': self._parse_python,
-            '.js': self._parse_javascript,
-            '.ts': self._parse_typescript,
-            '.java': self._parse_java,
-            '.cpp': self._parse_cpp,
-            '.cs': self._parse_csharp,
-            '.rs': self._parse_rust,
-            '.go': self._parse_go,
-            '.php': self._parse_php,
-            '.rb': self._parse_ruby,
-            '.swift': self._parse_swift,
-            '.kt': self._parse_kotlin,
-            '.scala': self._parse_scala,
-            '.dart': self._parse_dart,
-            '.r': self._parse_r,
-            '.m': self._parse_matlab,
-            '.sql': self._parse_sql,
-            '.sh': self._parse_bash,
-            '.html': self._parse_html,
-            '.css': self._parse_css,
-            '.vue': self._parse_vue,
-            '.jsx': self._parse_jsx,
-            '.tsx': self._parse_tsx
-        }
-    
-    def chunk_file(self, file_path: str) -> List[Dict[str, Any]]:
-        """Chunk a single file into logical code blocks."""
-        file_path = Path(file_path)
-        extension = file_path.suffix.lower()
-        
-        if extension not in self.supported_extensions:
-            return self._parse_generic(file_path)
-        
-        try:
-            return self.supported_extensions[extension](file_path)
-        except Exception as e:
-            logger.warning(f"Failed to parse {file_path}: {e}")
-            return self._parse_generic(file_path)
-    
-    def _parse_python(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Python file into functions, classes, and modules."""
-        chunks = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            tree = ast.parse(content)
-            
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                    chunk = {
-                        'type': 'function',
-                        'name': node.name,
-                        'code': ast.unparse(node),
-                        'start_line': node.lineno,
-                        'end_line': node.end_lineno if hasattr(node, 'end_lineno') else node.lineno,
-                        'docstring': ast.get_docstring(node) or ''
-                    }
-                    chunks.append(chunk)
-                
-                elif isinstance(node, ast.ClassDef):
-                    chunk = {
-                        'type': 'class',
-                        'name': node.name,
-                        'code': ast.unparse(node),
-                        'start_line': node.lineno,
-                        'end_line': node.end_lineno if hasattr(node, 'end_lineno') else node.lineno,
-                        'docstring': ast.get_docstring(node) or ''
-                    }
-                    chunks.append(chunk)
-            
-            # If no functions/classes found, create a module chunk
-            if not chunks:
-                chunks.append({
-                    'type': 'module',
-                    'name': file_path.stem,
-                    'code': content,
-                    'start_line': 1,
-                    'end_line': len(content.split('\n')),
-                    'docstring': ''
-                })
-                
-        except Exception as e:
-            logger.error(f"Error parsing Python file {file_path}: {e}")
-            # Fallback to generic parsing
-            return self._parse_generic(file_path)
-        
-        return chunks
-    
-    def _parse_javascript(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse JavaScript file into functions and classes."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(?:export\s+)?(?:async\s+)?function\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'(?:export\s+)?class\s+(\w+)\s*\{[^}]*\}',
-            r'const\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{[^}]*\}',
-            r'let\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{[^}]*\}',
-            r'var\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{[^}]*\}'
-        ])
-    
-    def _parse_typescript(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse TypeScript file (similar to JavaScript but with types)."""
-        return self._parse_javascript(file_path)
-    
-    def _parse_java(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Java file into classes and methods."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(?:public\s+)?class\s+(\w+)\s*\{[^}]*\}',
-            r'(?:public\s+|private\s+|protected\s+)?(?:static\s+)?(?:final\s+)?(?:synchronized\s+)?(?:native\s+)?(?:abstract\s+)?(?:default\s+)?(?:<[^>]*>\s+)?(?:[\w\[\]<>]+\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_cpp(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse C++ file into classes and functions."""
-        return self._parse_generic_with_regex(file_path, [
-            r'class\s+(\w+)\s*\{[^}]*\}',
-            r'(?:template\s*<[^>]*>\s*)?(?:inline\s+)?(?:static\s+)?(?:const\s+)?(?:virtual\s+)?(?:explicit\s+)?(?:[\w:<>]+\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_csharp(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse C# file into classes and methods."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(?:public\s+|private\s+|protected\s+|internal\s+)?(?:abstract\s+)?(?:sealed\s+)?(?:partial\s+)?(?:static\s+)?class\s+(\w+)\s*\{[^}]*\}',
-            r'(?:public\s+|private\s+|protected\s+|internal\s+)?(?:virtual\s+)?(?:override\s+)?(?:abstract\s+)?(?:static\s+)?(?:async\s+)?(?:[\w<>]+\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_rust(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Rust file into functions and structs."""
-        return self._parse_generic_with_regex(file_path, [
-            r'fn\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'struct\s+(\w+)\s*\{[^}]*\}',
-            r'impl\s+(\w+)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_go(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Go file into functions and structs."""
-        return self._parse_generic_with_regex(file_path, [
-            r'func\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'type\s+(\w+)\s+struct\s*\{[^}]*\}'
-        ])
-    
-    def _parse_php(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse PHP file into functions and classes."""
-        return self._parse_generic_with_regex(file_path, [
-            r'function\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'class\s+(\w+)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_ruby(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Ruby file into methods and classes."""
-        return self._parse_generic_with_regex(file_path, [
-            r'def\s+(\w+)[^}]*end',
-            r'class\s+(\w+)[^}]*end'
-        ])
-    
-    def _parse_swift(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Swift file into functions and classes."""
-        return self._parse_generic_with_regex(file_path, [
-            r'func\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'class\s+(\w+)\s*\{[^}]*\}',
-            r'struct\s+(\w+)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_kotlin(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Kotlin file into functions and classes."""
-        return self._parse_generic_with_regex(file_path, [
-            r'fun\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'class\s+(\w+)\s*\{[^}]*\}',
-            r'data\s+class\s+(\w+)\s*\([^)]*\)'
-        ])
-    
-    def _parse_scala(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Scala file into functions and classes."""
-        return self._parse_generic_with_regex(file_path, [
-            r'def\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'class\s+(\w+)\s*\{[^}]*\}',
-            r'object\s+(\w+)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_dart(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Dart file into functions and classes."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(?:void\s+|int\s+|String\s+|bool\s+|double\s+|dynamic\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'class\s+(\w+)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_r(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse R file into functions."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(\w+)\s*<-\s*function\s*\([^)]*\)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_matlab(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse MATLAB file into functions."""
-        return self._parse_generic_with_regex(file_path, [
-            r'function\s+(\w+)\s*\([^)]*\)[^}]*end'
-        ])
-    
-    def _parse_sql(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse SQL file into statements."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(?:CREATE|INSERT|UPDATE|DELETE|SELECT)\s+[^;]+;'
-        ])
-    
-    def _parse_bash(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Bash file into functions."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(\w+)\s*\(\)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_html(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse HTML file into sections."""
-        return self._parse_generic_with_regex(file_path, [
-            r'<[^>]+>[^<]*</[^>]+>',
-            r'<[^>]+/>'
-        ])
-    
-    def _parse_css(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse CSS file into rules."""
-        return self._parse_generic_with_regex(file_path, [
-            r'[^{}]+\{[^}]*\}'
-        ])
-    
-    def _parse_vue(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse Vue file into template, script, and style sections."""
-        return self._parse_generic_with_regex(file_path, [
-            r'<template>[^<]*</template>',
-            r'<script>[^<]*</script>',
-            r'<style>[^<]*</style>'
-        ])
-    
-    def _parse_jsx(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse JSX file into components."""
-        return self._parse_generic_with_regex(file_path, [
-            r'(?:export\s+)?(?:default\s+)?(?:function\s+)?(\w+)\s*\([^)]*\)\s*\{[^}]*\}',
-            r'(?:export\s+)?(?:default\s+)?class\s+(\w+)\s*\{[^}]*\}'
-        ])
-    
-    def _parse_tsx(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse TSX file (similar to JSX but with TypeScript)."""
-        return self._parse_jsx(file_path)
-    
-    def _parse_generic_with_regex(self, file_path: Path, patterns: List[str]) -> List[Dict[str, Any]]:
-        """Parse file using regex patterns."""
-        chunks = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            for pattern in patterns:
-                matches = re.finditer(pattern, content, re.DOTALL | re.MULTILINE)
-                for match in matches:
-                    chunk = {
-                        'type': 'code_block',
-                        'name': match.group(1) if match.groups() else f"block_{len(chunks)}",
-                        'code': match.group(0),
-                        'start_line': content[:match.start()].count('\n') + 1,
-                        'end_line': content[:match.end()].count('\n') + 1,
-                        'docstring': ''
-                    }
-                    chunks.append(chunk)
-            
-            # If no matches found, create a single chunk
-            if not chunks:
-                chunks.append({
-                    'type': 'file',
-                    'name': file_path.stem,
-                    'code': content,
-                    'start_line': 1,
-                    'end_line': len(content.split('\n')),
-                    'docstring': ''
-                })
-                
-        except Exception as e:
-            logger.error(f"Error parsing file {file_path}: {e}")
-            return self._parse_generic(file_path)
-        
-        return chunks
-    
-    def _parse_generic(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Generic parser for unsupported file types."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            return [{
-                'type': 'file',
-                'name': file_path.stem,
-                'code': content,
-                'start_line': 1,
-                'end_line': len(content.split('\n')),
-                'docstring': ''
-            }]
-        except Exception as e:
-            logger.error(f"Error reading file {file_path}: {e}")
-            return []
+# Uploads larger than this are skipped rather than read and chunked
+MAX_FILE_BYTES = 5 * 1024 * 1024
+
+# Upload batches with at least this many bytes of parseable files are chunked in worker processes
+PARALLEL_PARSE_MIN_BYTES = 2 * 1024 * 1024
+
+# HNSW graph with fp16 scalar-quantized vector storage, addressed by stable chunk ids
+INDEX_FACTORY = "IDMap2,HNSW32,SQfp16"
+
+# HNSW build-time and query-time beam widths
+HNSW_EF_CONSTRUCTION = 100
+HNSW_EF_SEARCH = 64
+
+# Saving rebuilds the index once replaced chunks leave more than this fraction of its vectors stale
+STALE_VECTOR_RATIO = 0.1
+
+# Batches of at least this many chunks are embedded across a pool of worker processes;
+# each worker loads its own copy of the model, so smaller batches are faster in-process
+MULTI_PROCESS_ENCODE_MIN = 4096
+
+# Upper bound on encoder worker processes
+MULTI_PROCESS_ENCODE_WORKERS = 4
+
+# Query embeddings kept for repeated searches
+QUERY_CACHE_SIZE = 512
+
+# Bump when the on-disk layout of the index or metadata changes
+STORE_FORMAT_VERSION = 4
+
+# Metadata fields stored for every chunk, in column order
+METADATA_COLUMNS = ('filename', 'file_path', 'chunk_type', 'chunk_name', 'code',
+                    'start_line', 'end_line', 'docstring', 'index_id', 'content_hash')
+
+def _chunk_id(chunk: Dict[str, Any]) -> int:
+    """Derive a stable, non-negative int64 id for a chunk from its file, line, name and code."""
+    key = f"{chunk['filename']}:{chunk['start_line']}:{chunk['chunk_name']}:{chunk['content_hash']}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') & ((1 << 63) - 1)
+
+def _content_hash(code: str) -> str:
+    """Hash a chunk's code to detect content that is already indexed."""
+    return hashlib.blake2b(code.encode('utf-8'), digest_size=8).hexdigest()
 
 class RAGEngine:
     """Main RAG engine for code search and retrieval."""
@@ -343,14 +93,19 @@ class RAGEngine:
         # Initialize the embedding model with error handling
         try:
             logger.info("Loading SentenceTransformer model...")
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = load_embedding_model()
             logger.info("SentenceTransformer model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load SentenceTransformer model: {e}")
             raise RuntimeError(f"Failed to initialize embedding model: {e}. This might be due to network issues or insufficient memory.")
         
         self.index = None
-        self.metadata = []
+        # chunk id -> chunk metadata
+        self.metadata: Dict[int, Dict[str, Any]] = {}
+        # content hash of a chunk's code -> chunk id, so unchanged chunks aren't embedded again
+        self.hash_to_id: Dict[str, int] = {}
+        # query -> (1, dimension) float32 embedding, least recently used first
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
         
         # Load existing index
         self._load_index()
@@ -359,56 +114,241 @@ class RAGEngine:
         """Load existing FAISS index and metadata."""
         # Define index and metadata paths
         self.index_path = self.vector_db_path / "faiss_index.bin"
+        self.manifest_path = self.vector_db_path / "manifest.json"
+        self.meta_dir = self.vector_db_path / "meta"
+        # Single-file metadata written by earlier versions; migrated into meta/ on the next save
         self.metadata_path = self.vector_db_path / "metadata.json"
+        self.parquet_path = self.metadata_path.with_suffix('.parquet')
+        
+        # Chunk ids changed since the last save, whether meta/ must be rewritten from scratch,
+        # and whether the index changed since the last save
+        self._unsaved_ids: List[int] = []
+        self._rewrite_metadata = True
+        self._dirty = False
+        # Whether self.index is a read-only memory map of index_path
+        self._index_mmapped = False
         
         try:
-            if self.index_path.exists() and self.metadata_path.exists():
-                self.index = faiss.read_index(str(self.index_path))
+            if self.index_path.exists() and self.manifest_path.exists():
+                with open(self.manifest_path, 'r') as f:
+                    manifest = json.load(f)
+                if manifest == self._manifest():
+                    self.index = self._read_index()
+                    self.metadata = {row['index_id']: row for row in self._read_metadata_parts()}
+                    self.hash_to_id = {row['content_hash']: i for i, row in self.metadata.items()}
+                    self._rewrite_metadata = False
+                elif manifest.get('dimension') == self._manifest()['dimension']:
+                    self._migrate_index(faiss.read_index(str(self.index_path)), self._read_metadata_parts())
+                else:
+                    raise ValueError(f"Stored index {manifest} does not match {self._manifest()}")
+                logger.info(f"Loaded existing index with {len(self.metadata)} chunks")
+            elif pq is not None and self.index_path.exists() and self.parquet_path.exists():
+                self._migrate_index(faiss.read_index(str(self.index_path)),
+                                    pq.read_table(self.parquet_path).to_pylist())
+                logger.info(f"Loaded existing index with {len(self.metadata)} chunks")
+            elif self.index_path.exists() and self.metadata_path.exists():
                 with open(self.metadata_path, 'r') as f:
-                    self.metadata = json.load(f)
+                    rows = json.load(f)
+                self._migrate_index(faiss.read_index(str(self.index_path)), rows)
                 logger.info(f"Loaded existing index with {len(self.metadata)} chunks")
             else:
                 # Create new index
-                dimension = self.model.get_sentence_embedding_dimension()
-                self.index = faiss.IndexFlatIP(dimension)
-                self.metadata = []
+                self.index = self._create_index()
+                self.metadata = {}
+                self.hash_to_id = {}
                 logger.info("Created new FAISS index")
         except Exception as e:
             logger.error(f"Error loading index: {e}")
-            dimension = self.model.get_sentence_embedding_dimension()
-            self.index = faiss.IndexFlatIP(dimension)
-            self.metadata = []
+            self.index = self._create_index()
+            self._index_mmapped = False
+            self.metadata = {}
+            self.hash_to_id = {}
+            self._unsaved_ids = []
+            self._rewrite_metadata = True
+    
+    def _create_index(self):
+        """Create an empty id-mapped HNSW index; inner product on normalized vectors is cosine similarity."""
+        dimension = self.model.get_sentence_embedding_dimension()
+        index = faiss.index_factory(dimension, INDEX_FACTORY, faiss.METRIC_INNER_PRODUCT)
+        hnsw = faiss.downcast_index(index.index).hnsw
+        hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    
+    def _migrate_index(self, old_index, rows: List[Dict[str, Any]]):
+        """
+        Rebuild a store from an earlier version, keyed by stable chunk ids.
+        
+        Args:
+            old_index: Id-mapped index, or an index whose vector positions line up with rows
+            rows: Chunk metadata in the order it was written
+        """
+        if isinstance(old_index, faiss.IndexIDMap2):
+            # Later rows replace earlier ones with the same id
+            rows = list({row['index_id']: row for row in rows}.values())
+            vectors = np.array([old_index.reconstruct(row['index_id']) for row in rows], dtype=np.float32)
+        else:
+            vectors = old_index.reconstruct_n(0, old_index.ntotal)
+        self.index = self._create_index()
+        self.metadata = {}
+        self.hash_to_id = {}
+        if rows:
+            self._add_chunks(vectors, rows)
+        self._rewrite_metadata = True
+        self._save_index()
+    
+    def _drop_chunks(self, ids: List[int]):
+        """
+        Remove chunks from the metadata; their vectors stay stale in the index until compaction.
+        
+        A content hash keeps pointing at a live chunk with the same code, and is dropped
+        only once its last live chunk is gone, so reused vectors never come from a removed id.
+        """
+        orphaned = set()
+        for chunk_id in ids:
+            row = self.metadata.pop(chunk_id)
+            if self.hash_to_id.get(row['content_hash']) == chunk_id:
+                del self.hash_to_id[row['content_hash']]
+                orphaned.add(row['content_hash'])
+        if orphaned:
+            for chunk_id, row in self.metadata.items():
+                if row['content_hash'] in orphaned:
+                    self.hash_to_id.setdefault(row['content_hash'], chunk_id)
+        self._rewrite_metadata = True
+    
+    def _compact_index(self):
+        """Rebuild the index from the vectors of live chunks, dropping those left by replaced chunks."""
+        ids = list(self.metadata)
+        vectors = np.array([self.index.reconstruct(chunk_id) for chunk_id in ids], dtype=np.float32)
+        self.index = self._create_index()
+        self._index_mmapped = False
+        if ids:
+            if not self.index.is_trained:
+                self.index.train(vectors)
+            self.index.add_with_ids(vectors, np.array(ids, dtype=np.int64))
+        self._dirty = True
+    
+    def _add_chunks(self, embeddings: np.ndarray, rows: List[Dict[str, Any]]):
+        """Add chunk vectors under their stable ids; a re-added chunk replaces its metadata."""
+        for row in rows:
+            # Rows migrated from earlier versions have no hash yet
+            row.setdefault('content_hash', _content_hash(row['code']))
+        ids = np.array([_chunk_id(row) for row in rows], dtype=np.int64)
+        
+        # Add to FAISS index in a single call; quantizers that need training learn from the first batch
+        self._ensure_writable_index()
+        if not self.index.is_trained:
+            self.index.train(embeddings)
+        self.index.add_with_ids(embeddings, ids)
+        self._dirty = True
+        
+        for chunk_id, row in zip(ids.tolist(), rows):
+            row['index_id'] = chunk_id
+            previous = self.metadata.get(chunk_id)
+            if previous is not None and self.hash_to_id.get(previous['content_hash']) == chunk_id:
+                del self.hash_to_id[previous['content_hash']]
+            self.metadata[chunk_id] = row
+            self.hash_to_id[row['content_hash']] = chunk_id
+        self._unsaved_ids.extend(ids.tolist())
+    
+    def _read_index(self):
+        """Memory-map the stored index read-only, so startup and RSS don't scale with its size."""
+        index = faiss.read_index(str(self.index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        self._index_mmapped = True
+        return index
+    
+    def _ensure_writable_index(self):
+        """Swap a memory-mapped index for an in-memory copy before it is modified."""
+        if self._index_mmapped:
+            self.index = faiss.read_index(str(self.index_path))
+            self._index_mmapped = False
+    
+    def _manifest(self) -> Dict[str, Any]:
+        """Describe the on-disk format so an incompatible store is rebuilt instead of misread."""
+        return {
+            'version': STORE_FORMAT_VERSION,
+            'dimension': self.model.get_sentence_embedding_dimension(),
+            'index_factory': INDEX_FACTORY
+        }
     
     def _save_index(self):
-        """Save FAISS index and metadata."""
+        """Save the FAISS index if it changed, and append new metadata rows."""
         try:
-            faiss.write_index(self.index, str(self.index_path))
-            with open(self.metadata_path, 'w') as f:
-                json.dump(self.metadata, f, indent=2)
+            if self.index is not None and self.index.ntotal - len(self.metadata) > STALE_VECTOR_RATIO * self.index.ntotal:
+                self._compact_index()
+            if self._dirty:
+                faiss.write_index(self.index, str(self.index_path))
+                self._dirty = False
+            self._save_metadata()
+            with open(self.manifest_path, 'w') as f:
+                json.dump(self._manifest(), f)
             logger.info("Index saved successfully")
         except Exception as e:
             logger.error(f"Error saving index: {e}")
     
+    def _save_metadata(self):
+        """
+        Write the chunks changed since the last save as a new part file in meta/.
+        
+        Parts are zstd-compressed Parquet, or JSON without pyarrow; rows in later
+        parts replace earlier rows with the same id. A new, cleared or migrated
+        store replaces all existing parts.
+        """
+        if self._rewrite_metadata:
+            shutil.rmtree(self.meta_dir, ignore_errors=True)
+            self._unsaved_ids = list(self.metadata)
+        self.meta_dir.mkdir(exist_ok=True)
+        
+        rows = [self.metadata[i] for i in dict.fromkeys(self._unsaved_ids) if i in self.metadata]
+        if rows:
+            part = self.meta_dir / f"part-{sum(1 for _ in self.meta_dir.glob('part-*')):05d}"
+            if pq is None:
+                with open(part.with_suffix('.json'), 'w') as f:
+                    json.dump(rows, f)
+            else:
+                table = pa.table({col: [m[col] for m in rows] for col in METADATA_COLUMNS})
+                pq.write_table(table, part.with_suffix('.parquet'), compression='zstd')
+        
+        if self._rewrite_metadata:
+            # The parts supersede single-file metadata from earlier versions
+            self.metadata_path.unlink(missing_ok=True)
+            self.parquet_path.unlink(missing_ok=True)
+            self._rewrite_metadata = False
+        self._unsaved_ids = []
+    
+    def _read_metadata_parts(self) -> List[Dict[str, Any]]:
+        """Read every metadata part in write order."""
+        metadata = []
+        for part in sorted(self.meta_dir.glob('part-*')):
+            if part.suffix == '.parquet':
+                if pq is None:
+                    raise ImportError(f"pyarrow is required to read {part.name}")
+                metadata.extend(pq.read_table(part).to_pylist())
+            else:
+                with open(part, 'r') as f:
+                    metadata.extend(json.load(f))
+        return metadata
+    
     def process_uploaded_files(self, uploaded_files: List[Any]) -> Dict[str, Any]:
         """Process uploaded files and add them to the vector database."""
         processed_files = []
         total_chunks = 0
+        contents = []
         
         for uploaded_file in uploaded_files:
             try:
-                # Save uploaded file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix=uploaded_file.name) as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    tmp_path = tmp_file.name
-                
-                # Process the file
-                file_result = self._process_single_file(tmp_path, uploaded_file.name)
-                processed_files.append(file_result)
-                total_chunks += file_result['chunks_added']
-                
-                # Clean up temporary file
-                os.unlink(tmp_path)
-                
+                # Check the reported size first so oversized uploads are never copied into memory
+                size = getattr(uploaded_file, 'size', None)
+                data = uploaded_file.getvalue() if size is None or size <= MAX_FILE_BYTES else None
+                if data is None or len(data) > MAX_FILE_BYTES:
+                    processed_files.append({
+                        'filename': uploaded_file.name,
+                        'status': 'skipped',
+                        'reason': f'File larger than {MAX_FILE_BYTES // (1024 * 1024)} MB',
+                        'chunks_added': 0
+                    })
+                    continue
+                contents.append((uploaded_file.name, data))
             except Exception as e:
                 logger.error(f"Error processing file {uploaded_file.name}: {e}")
                 processed_files.append({
@@ -418,6 +358,21 @@ class RAGEngine:
                     'chunks_added': 0
                 })
         
+        # Parse every file first (in parallel for larger batches), then embed and index
+        for (name, _), chunks in zip(contents, self._chunk_files(contents)):
+            try:
+                file_result = self._process_single_file(name, chunks)
+                processed_files.append(file_result)
+                total_chunks += file_result['chunks_added']
+            except Exception as e:
+                logger.error(f"Error processing file {name}: {e}")
+                processed_files.append({
+                    'filename': name,
+                    'status': 'error',
+                    'error': str(e),
+                    'chunks_added': 0
+                })
+        
         # Save the updated index
         self._save_index()
         
@@ -427,12 +382,41 @@ class RAGEngine:
             'total_chunks_in_index': len(self.metadata)
         }
     
-    def _process_single_file(self, file_path: str, original_name: str) -> Dict[str, Any]:
-        """Process a single file and add its chunks to the index."""
-        file_path = Path(file_path)
+    def _chunk_files(self, files: List[Tuple[str, bytes]]) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Chunk uploaded files, using worker processes when there are enough of them.
+        
+        Args:
+            files: List of (original filename, file contents) pairs
         
+        Returns:
+            Chunks per file in the same order, or None for unsupported file types
+        """
+        positions = [i for i, (name, _) in enumerate(files)
+                     if Path(name).suffix.lower() in SUPPORTED_EXTENSIONS]
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(files)
+        
+        chunked = None
+        if len(positions) > 1 and sum(len(files[i][1]) for i in positions) >= PARALLEL_PARSE_MIN_BYTES:
+            names = [files[i][0] for i in positions]
+            datas = [files[i][1] for i in positions]
+            try:
+                with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(names))) as executor:
+                    chunked = list(executor.map(_chunk_one, names, datas, chunksize=4))
+            except Exception as e:
+                logger.warning(f"Parallel parsing failed, parsing serially: {e}")
+        if chunked is None:
+            chunked = [self.chunker.chunk_bytes(*files[i]) for i in positions]
+        
+        for i, chunks in zip(positions, chunked):
+            results[i] = chunks
+        return results
+    
+    def _process_single_file(self, original_name: str,
+                             chunks: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Add a parsed file's chunks to the index; chunks is None for unsupported file types."""
         # Check if it's a supported file type
-        if file_path.suffix.lower() not in self.chunker.supported_extensions:
+        if chunks is None or Path(original_name).suffix.lower() not in SUPPORTED_EXTENSIONS:
             return {
                 'filename': original_name,
                 'status': 'skipped',
@@ -440,9 +424,6 @@ class RAGEngine:
                 'chunks_added': 0
             }
         
-        # Chunk the file
-        chunks = self.chunker.chunk_file(file_path)
-        
         if not chunks:
             return {
                 'filename': original_name,
@@ -451,66 +432,111 @@ class RAGEngine:
                 'chunks_added': 0
             }
         
-        # Generate embeddings and add to index
-        chunks_added = 0
+        # Skip chunks that are already indexed unchanged, e.g. those of a re-uploaded file
+        rows = []
+        ids = set()
         for chunk in chunks:
-            try:
-                # Create text representation for embedding
-                text_for_embedding = f"{chunk['name']} {chunk['type']} {chunk['code']}"
-                
-                # Generate embedding
-                embedding = self.model.encode([text_for_embedding])[0]
-                
-                # Add to FAISS index
-                self.index.add(np.array([embedding], dtype=np.float32))
-                
-                # Store metadata
-                chunk_metadata = {
-                    'filename': original_name,
-                    'file_path': str(file_path),
-                    'chunk_type': chunk['type'],
-                    'chunk_name': chunk['name'],
-                    'code': chunk['code'],
-                    'start_line': chunk['start_line'],
-                    'end_line': chunk['end_line'],
-                    'docstring': chunk['docstring'],
-                    'index_id': len(self.metadata)
-                }
-                self.metadata.append(chunk_metadata)
-                chunks_added += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing chunk {chunk['name']}: {e}")
+            row = {
+                'filename': original_name,
+                'file_path': original_name,
+                'chunk_type': chunk['type'],
+                'chunk_name': chunk['name'],
+                'code': chunk['code'],
+                'start_line': chunk['start_line'],
+                'end_line': chunk['end_line'],
+                'docstring': chunk['docstring'],
+                'content_hash': _content_hash(chunk['code'])
+            }
+            chunk_id = _chunk_id(row)
+            ids.add(chunk_id)
+            if chunk_id not in self.metadata:
+                rows.append(row)
+        # Chunks of an earlier upload of this file that this version no longer contains
+        replaced = [i for i, m in self.metadata.items() if m['filename'] == original_name and i not in ids]
+        
+        if rows:
+            # Embed each new code text once, in one batched call; code that is already
+            # indexed under another file or name reuses its stored vector
+            texts = {}
+            for row in rows:
+                if row['content_hash'] not in self.hash_to_id:
+                    texts.setdefault(row['content_hash'], f"{row['chunk_name']} {row['chunk_type']} {row['code']}")
+            vectors = {}
+            if texts:
+                try:
+                    vectors = dict(zip(texts, self._encode_chunks(list(texts.values()))))
+                except Exception as e:
+                    logger.error(f"Error embedding chunks of {original_name}: {e}")
+                    return {
+                        'filename': original_name,
+                        'status': 'error',
+                        'error': str(e),
+                        'chunks_added': 0
+                    }
+            
+            embeddings = np.array([
+                vectors[row['content_hash']] if row['content_hash'] in vectors
+                else self.index.reconstruct(self.hash_to_id[row['content_hash']])
+                for row in rows
+            ], dtype=np.float32)
+            self._add_chunks(embeddings, rows)
+        
+        if replaced:
+            self._drop_chunks(replaced)
         
         return {
             'filename': original_name,
             'status': 'success',
-            'chunks_added': chunks_added,
+            'chunks_added': len(rows),
             'total_chunks': len(chunks)
         }
     
+    def _encode_chunks(self, texts: List[str]) -> np.ndarray:
+        """Embed chunk texts as unit-length float32 rows, sharding very large batches across processes."""
+        workers = min(os.cpu_count() or 1, MULTI_PROCESS_ENCODE_WORKERS)
+        if len(texts) >= MULTI_PROCESS_ENCODE_MIN and workers > 1:
+            pool = None
+            try:
+                pool = self.model.start_multi_process_pool(target_devices=['cpu'] * workers)
+                embeddings = np.ascontiguousarray(
+                    self.model.encode_multi_process(texts, pool, batch_size=64), dtype=np.float32
+                )
+                faiss.normalize_L2(embeddings)
+                return embeddings
+            except Exception as e:
+                logger.warning(f"Multi-process encoding failed, encoding in-process: {e}")
+            finally:
+                if pool is not None:
+                    self.model.stop_multi_process_pool(pool)
+        
+        return np.ascontiguousarray(self.model.encode(
+            texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        ), dtype=np.float32)
+    
     def search_code(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search for relevant code chunks using semantic similarity."""
         if not self.metadata or self.index is None:
             return []
         
         try:
-            # Generate query embedding
-            query_embedding = self.model.encode([query])[0]
-            
-            # Search the index
-            scores, indices = self.index.search(
-                np.array([query_embedding], dtype=np.float32), 
-                min(top_k, len(self.metadata))
-            )
+            # Search the index, over-fetching by the number of replaced vectors so top_k distinct chunks are found
+            stale = max(0, self.index.ntotal - len(self.metadata))
+            scores, indices = self.index.search(self._embed_query(query), min(top_k + stale, self.index.ntotal))
             
             # Return results with metadata
             results = []
+            seen = set()
             for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.metadata):
-                    result = self.metadata[idx].copy()
+                # HNSW pads with -1 when it finds fewer than top_k neighbors, and a
+                # re-added chunk keeps its old vector under the same id
+                chunk = self.metadata.get(int(idx))
+                if chunk is not None and idx not in seen:
+                    seen.add(idx)
+                    result = chunk.copy()
                     result['similarity_score'] = float(score)
                     results.append(result)
+                    if len(results) == top_k:
+                        break
             
             return results
             
@@ -518,6 +544,19 @@ class RAGEngine:
             logger.error(f"Error searching code: {e}")
             return []
     
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query, reusing the embedding of recently repeated queries."""
+        embedding = self._query_cache.get(query)
+        if embedding is not None:
+            self._query_cache.move_to_end(query)
+            return embedding
+        
+        embedding = np.ascontiguousarray(self.model.encode([query], normalize_embeddings=True), dtype=np.float32)
+        self._query_cache[query] = embedding
+        while len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embedding
+    
     def get_code_context(self, query: str, top_k: int = 3) -> str:
         """Get relevant code context for LLM prompts."""
         results = self.search_code(query, top_k)
@@ -538,9 +577,13 @@ class RAGEngine:
     def clear_index(self):
         """Clear the entire index."""
         try:
-            dimension = self.model.get_sentence_embedding_dimension()
-            self.index = faiss.IndexFlatIP(dimension)
-            self.metadata = []
+            self.index = self._create_index()
+            self._index_mmapped = False
+            self.metadata = {}
+            self.hash_to_id = {}
+            self._unsaved_ids = []
+            self._rewrite_metadata = True
+            self._dirty = True
             self._save_index()
             logger.info("Index cleared successfully")
         except Exception as e:
@@ -551,5 +594,5 @@ class RAGEngine:
         return {
             'total_chunks': len(self.metadata),
             'index_size': self.index.ntotal if self.index else 0,
-            'files_processed': len(set(chunk['filename'] for chunk in self.metadata))
+            'files_processed': len(set(chunk['filename'] for chunk in self.metadata.values()))
         } 
\ No newline at end of file
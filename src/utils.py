@@ -5,76 +5,100 @@ Helper functions for parsing, formatting, and other utilities.
 
 import re
 import logging
-from typing import Dict, Any, List, Optional
+import functools
+import sys
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-# Supported programming languages
-SUPPORTED_LANGUAGES = {
-    "python": "Python",
-    "javascript": "JavaScript",
-    "java": "Java",
-    "cpp": "C++",
-    "csharp": "C#",
-    "rust": "Rust",
-    "go": "Go",
-    "sql": "SQL",
-    "bash": "Bash",
-    "php": "PHP",
-    "ruby": "Ruby",
-    "swift": "Swift",
-    "kotlin": "Kotlin",
-    "typescript": "TypeScript",
-    "html": "HTML",
-    "css": "CSS",
-    "scala": "Scala",
-    "perl": "Perl",
-    "r": "R",
-    "matlab": "MATLAB",
-    "dart": "Dart",
-    "elixir": "Elixir",
-    "clojure": "Clojure",
-    "haskell": "Haskell",
-    "lua": "Lua",
-    "assembly": "Assembly",
-    "fortran": "Fortran",
-    "cobol": "COBOL",
-    "pascal": "Pascal",
-    "basic": "BASIC",
-    "ada": "Ada",
-    "lisp": "Lisp",
-    "prolog": "Prolog",
-    "erlang": "Erlang",
-    "ocaml": "OCaml",
-    "fsharp": "F#",
-    "groovy": "Groovy",
-    "julia": "Julia",
-    "nim": "Nim",
-    "zig": "Zig",
-    "v": "V",
-    "crystal": "Crystal",
-    "nim": "Nim",
-    "zig": "Zig",
-    "v": "V",
-    "crystal": "Crystal",
-    "odin": "Odin",
-    "carbon": "Carbon",
-    "mojo": "Mojo",
-    "vlang": "V",
-    "carbon": "Carbon",
-    "mojo": "Mojo"
+# Fenced markdown code blocks
+_CODE_BLOCK_RE = re.compile(r'```(?:\w+)?\n(.*?)```', re.DOTALL)
+
+# Filename and task-description scrubbing
+_UNSAFE_FN_TRANS = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+_NON_WORD_RE = re.compile(r'[^\w\s-]')
+
+# Plausible API key: 20-128 URL-safe token characters
+_API_KEY_FORMAT_RE = re.compile(r'[A-Za-z0-9_\-]{20,128}')
+
+# Credentials that must not appear in displayed error messages
+_SECRET_RE = re.compile(r'(api_key|token)["\']?\s*[:=]\s*["\'][^"\']*["\']')
+
+class LangRecord(NamedTuple):
+    """Everything the UI needs to know about one language."""
+    display: str
+    extension: str
+    executable: bool
+    description: str
+
+# Per-language record, keyed by language key; the single source for the helpers below
+_LANG_RECORDS: Dict[str, LangRecord] = {
+    "python": LangRecord("Python", ".py", True, "High-level, interpreted programming language known for simplicity and readability"),
+    "javascript": LangRecord("JavaScript", ".js", False, "Dynamic programming language primarily used for web development"),
+    "java": LangRecord("Java", ".java", False, "Object-oriented programming language with strong typing and platform independence"),
+    "cpp": LangRecord("C++", ".cpp", False, "General-purpose programming language with high performance and low-level control"),
+    "csharp": LangRecord("C#", ".cs", False, "Modern object-oriented language developed by Microsoft"),
+    "rust": LangRecord("Rust", ".rs", False, "Systems programming language focused on safety and performance"),
+    "go": LangRecord("Go", ".go", False, "Statically typed, compiled language designed for simplicity and efficiency"),
+    "sql": LangRecord("SQL", ".sql", True, "Structured Query Language for database management and data manipulation"),
+    "bash": LangRecord("Bash", ".sh", True, "Command-line shell and scripting language for Unix-like systems"),
+    "php": LangRecord("PHP", ".php", False, "Server-side scripting language designed for web development"),
+    "ruby": LangRecord("Ruby", ".rb", False, "Dynamic, object-oriented programming language with elegant syntax"),
+    "swift": LangRecord("Swift", ".swift", False, "Modern programming language for iOS, macOS, and other Apple platforms"),
+    "kotlin": LangRecord("Kotlin", ".kt", False, "Modern programming language that runs on the Java Virtual Machine"),
+    "typescript": LangRecord("TypeScript", ".ts", False, "Typed superset of JavaScript that compiles to plain JavaScript"),
+    "html": LangRecord("HTML", ".html", False, "Markup language for creating web pages and applications"),
+    "css": LangRecord("CSS", ".css", False, "Style sheet language used for describing the presentation of documents"),
+    "scala": LangRecord("Scala", ".scala", False, "Object-oriented and functional programming language for the JVM"),
+    "perl": LangRecord("Perl", ".pl", False, "High-level, general-purpose programming language"),
+    "r": LangRecord("R", ".r", False, "Programming language and environment for statistical computing"),
+    "matlab": LangRecord("MATLAB", ".m", False, "Numerical computing environment and programming language"),
+    "dart": LangRecord("Dart", ".dart", False, "Client-optimized language for fast apps on any platform"),
+    "elixir": LangRecord("Elixir", ".ex", False, "Functional, concurrent programming language built on the Erlang VM"),
+    "clojure": LangRecord("Clojure", ".clj", False, "Dynamic, general-purpose programming language"),
+    "haskell": LangRecord("Haskell", ".hs", False, "Purely functional programming language with strong static typing"),
+    "lua": LangRecord("Lua", ".lua", False, "Lightweight, high-level programming language designed for embedded use"),
+    "assembly": LangRecord("Assembly", ".asm", False, "Low-level programming language that provides direct hardware control"),
+    "fortran": LangRecord("Fortran", ".f90", False, "General-purpose programming language especially suited to numeric computation"),
+    "cobol": LangRecord("COBOL", ".cob", False, "Business-oriented programming language"),
+    "pascal": LangRecord("Pascal", ".pas", False, "Imperative and procedural programming language"),
+    "basic": LangRecord("BASIC", ".bas", False, "High-level programming language designed for beginners"),
+    "ada": LangRecord("Ada", ".adb", False, "Statically typed, imperative programming language"),
+    "lisp": LangRecord("Lisp", ".lisp", False, "Family of programming languages with a distinctive parenthesized syntax"),
+    "prolog": LangRecord("Prolog", ".pl", False, "Logic programming language associated with artificial intelligence"),
+    "erlang": LangRecord("Erlang", ".erl", False, "General-purpose, concurrent programming language"),
+    "ocaml": LangRecord("OCaml", ".ml", False, "General-purpose programming language with an emphasis on expressiveness"),
+    "fsharp": LangRecord("F#", ".fs", False, "Functional-first programming language"),
+    "groovy": LangRecord("Groovy", ".groovy", False, "Dynamic language for the Java platform"),
+    "julia": LangRecord("Julia", ".jl", False, "High-level, high-performance programming language for technical computing"),
+    "nim": LangRecord("Nim", ".nim", False, "Statically typed, compiled programming language"),
+    "zig": LangRecord("Zig", ".zig", False, "General-purpose programming language and toolchain"),
+    "v": LangRecord("V", ".v", False, "Simple, fast, compiled language for developing maintainable software"),
+    "crystal": LangRecord("Crystal", ".cr", False, "Statically typed, compiled programming language"),
+    "odin": LangRecord("Odin", ".odin", False, "Data-oriented programming language"),
+    "carbon": LangRecord("Carbon", ".carbon", False, "Experimental successor to C++"),
+    "mojo": LangRecord("Mojo", ".mojo", False, "Programming language for AI developers"),
+    "vlang": LangRecord("V", ".txt", False, "Programming language")
 }
 
+# Supported programming languages: language key -> display name
+SUPPORTED_LANGUAGES = {key: record.display for key, record in _LANG_RECORDS.items()}
+
+# Languages the code executor can run safely
+_EXECUTABLE_LANGS = frozenset(key for key, record in _LANG_RECORDS.items() if record.executable)
+
+# Display name (lowercased) -> language key; the first key listed wins for shared names
+_DISPLAY_TO_KEY = {sys.intern(name.lower()): key for key, name in reversed(SUPPORTED_LANGUAGES.items())}
+
 def get_language_name(language_key: str) -> str:
     """Get display name for language key."""
-    return SUPPORTED_LANGUAGES.get(language_key.lower(), language_key.title())
+    record = _LANG_RECORDS.get(language_key.lower())
+    return record.display if record else language_key.title()
 
 def get_language_key(display_name: str) -> str:
     """Get language key from display name."""
-    for key, name in SUPPORTED_LANGUAGES.items():
-        if name.lower() == display_name.lower():
-            return key
-    return display_name.lower()
+    lowered = display_name.lower()
+    return _DISPLAY_TO_KEY.get(lowered, lowered)
 
 def get_supported_languages() -> List[str]:
     """Get list of supported language names."""
@@ -86,8 +110,10 @@ def get_language_keys() -> List[str]:
 
 def extract_code_blocks(text: str) -> List[str]:
     """Extract code blocks from text (markdown-style)."""
-    pattern = r'```(?:\w+)?\n(.*?)```'
-    matches = re.findall(pattern, text, re.DOTALL)
+    # Most one-shot answers have no fences at all; skip the regex scan for them
+    if '```' not in text:
+        return []
+    matches = _CODE_BLOCK_RE.findall(text)
     return [match.strip() for match in matches]
 
 def clean_code(code: str) -> str:
@@ -96,8 +122,12 @@ def clean_code(code: str) -> str:
     code = code.strip()
     
     # Remove markdown code block markers if present
-    code = re.sub(r'^```\w*\n', '', code)
-    code = re.sub(r'\n```$', '', code)
+    if code.startswith('```'):
+        newline = code.find('\n')
+        # The opening fence line holds at most a short language tag
+        if 0 < newline < 20:
+            code = code[newline + 1:]
+    code = code.removesuffix('\n```')
     
     return code
 
@@ -105,89 +135,36 @@ def format_execution_time(seconds: float) -> str:
     """Format execution time in a human-readable format."""
     if seconds < 1:
         return f"{seconds * 1000:.1f}ms"
-    elif seconds < 60:
-        return f"{seconds:.2f}s"
-    else:
-        minutes = int(seconds // 60)
-        remaining_seconds = seconds % 60
-        return f"{minutes}m {remaining_seconds:.1f}s"
+    
+    minutes, remaining_seconds = divmod(seconds, 60.0)
+    if not minutes:
+        return f"{remaining_seconds:.2f}s"
+    return f"{int(minutes)}m {remaining_seconds:.1f}s"
 
 def validate_api_key(api_key: str) -> bool:
     """Validate API key format."""
-    if not api_key:
-        return False
-    
     # Basic validation - check if it looks like a valid API key
     # Groq API keys are typically 64 characters
     # Gemini API keys are typically 39 characters
-    if len(api_key) < 20:
-        return False
-    
-    return True
+    return bool(api_key) and _API_KEY_FORMAT_RE.fullmatch(api_key) is not None
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe file operations."""
     # Remove or replace unsafe characters
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    filename = re.sub(r'\s+', '_', filename)
+    filename = filename.translate(_UNSAFE_FN_TRANS)
+    filename = '_'.join(filename.split())
     return filename[:100]  # Limit length
 
 def get_file_extension(language: str) -> str:
     """Get file extension for a programming language."""
-    extensions = {
-        "python": ".py",
-        "javascript": ".js",
-        "java": ".java",
-        "cpp": ".cpp",
-        "csharp": ".cs",
-        "rust": ".rs",
-        "go": ".go",
-        "sql": ".sql",
-        "bash": ".sh",
-        "php": ".php",
-        "ruby": ".rb",
-        "swift": ".swift",
-        "kotlin": ".kt",
-        "typescript": ".ts",
-        "html": ".html",
-        "css": ".css",
-        "scala": ".scala",
-        "perl": ".pl",
-        "r": ".r",
-        "matlab": ".m",
-        "dart": ".dart",
-        "elixir": ".ex",
-        "clojure": ".clj",
-        "haskell": ".hs",
-        "lua": ".lua",
-        "assembly": ".asm",
-        "fortran": ".f90",
-        "cobol": ".cob",
-        "pascal": ".pas",
-        "basic": ".bas",
-        "ada": ".adb",
-        "lisp": ".lisp",
-        "prolog": ".pl",
-        "erlang": ".erl",
-        "ocaml": ".ml",
-        "fsharp": ".fs",
-        "groovy": ".groovy",
-        "julia": ".jl",
-        "nim": ".nim",
-        "zig": ".zig",
-        "v": ".v",
-        "crystal": ".cr",
-        "odin": ".odin",
-        "carbon": ".carbon",
-        "mojo": ".mojo"
-    }
-    return extensions.get(language.lower(), ".txt")
+    record = _LANG_RECORDS.get(language.lower())
+    return record.extension if record else ".txt"
 
 def create_download_filename(language: str, task: str) -> str:
     """Create a filename for code download."""
     # Clean the task description
-    clean_task = re.sub(r'[^\w\s-]', '', task)
-    clean_task = re.sub(r'\s+', '_', clean_task)
+    clean_task = _NON_WORD_RE.sub('', task)
+    clean_task = '_'.join(clean_task.split())
     clean_task = clean_task[:50]  # Limit length
     
     extension = get_file_extension(language)
@@ -196,74 +173,39 @@ def create_download_filename(language: str, task: str) -> str:
 def format_error_message(error: str) -> str:
     """Format error message for display."""
     # Remove sensitive information
-    error = re.sub(r'api_key["\']?\s*[:=]\s*["\'][^"\']*["\']', 'api_key="***"', error)
-    error = re.sub(r'token["\']?\s*[:=]\s*["\'][^"\']*["\']', 'token="***"', error)
+    error = _SECRET_RE.sub(r'\1="***"', error)
     
     return error
 
 def is_executable_language(language: str) -> bool:
     """Check if language supports safe execution."""
-    executable_languages = ["python", "sql", "bash"]
-    return language.lower() in executable_languages
+    return language.lower() in _EXECUTABLE_LANGS
+
+@functools.lru_cache(maxsize=128)
+def _language_fields(language: str) -> Tuple[str, str, str, bool, str]:
+    """Resolve (name, key, extension, executable, description) for a language."""
+    # Cached results outlive the call, so share one copy of each key string
+    key = sys.intern(language.lower())
+    record = _LANG_RECORDS.get(key)
+    if record is None:
+        return language.title(), key, ".txt", False, "Programming language"
+    return record.display, key, record.extension, record.executable, record.description
 
 def get_language_info(language: str) -> Dict[str, Any]:
     """Get information about a programming language."""
+    # The lookup is cached; the dict is built per call so callers may modify it
+    name, key, extension, executable, description = _language_fields(language)
+    
     info = {
-        "name": get_language_name(language),
-        "key": language.lower(),
-        "executable": is_executable_language(language),
-        "extension": get_file_extension(language),
-        "description": get_language_description(language)
+        "name": name,
+        "key": key,
+        "executable": executable,
+        "extension": extension,
+        "description": description
     }
     return info
 
 def get_language_description(language: str) -> str:
     """Get description of a programming language."""
-    descriptions = {
-        "python": "High-level, interpreted programming language known for simplicity and readability",
-        "javascript": "Dynamic programming language primarily used for web development",
-        "java": "Object-oriented programming language with strong typing and platform independence",
-        "cpp": "General-purpose programming language with high performance and low-level control",
-        "csharp": "Modern object-oriented language developed by Microsoft",
-        "rust": "Systems programming language focused on safety and performance",
-        "go": "Statically typed, compiled language designed for simplicity and efficiency",
-        "sql": "Structured Query Language for database management and data manipulation",
-        "bash": "Command-line shell and scripting language for Unix-like systems",
-        "php": "Server-side scripting language designed for web development",
-        "ruby": "Dynamic, object-oriented programming language with elegant syntax",
-        "swift": "Modern programming language for iOS, macOS, and other Apple platforms",
-        "kotlin": "Modern programming language that runs on the Java Virtual Machine",
-        "typescript": "Typed superset of JavaScript that compiles to plain JavaScript",
-        "html": "Markup language for creating web pages and applications",
-        "css": "Style sheet language used for describing the presentation of documents",
-        "scala": "Object-oriented and functional programming language for the JVM",
-        "perl": "High-level, general-purpose programming language",
-        "r": "Programming language and environment for statistical computing",
-        "matlab": "Numerical computing environment and programming language",
-        "dart": "Client-optimized language for fast apps on any platform",
-        "elixir": "Functional, concurrent programming language built on the Erlang VM",
-        "clojure": "Dynamic, general-purpose programming language",
-        "haskell": "Purely functional programming language with strong static typing",
-        "lua": "Lightweight, high-level programming language designed for embedded use",
-        "assembly": "Low-level programming language that provides direct hardware control",
-        "fortran": "General-purpose programming language especially suited to numeric computation",
-        "cobol": "Business-oriented programming language",
-        "pascal": "Imperative and procedural programming language",
-        "basic": "High-level programming language designed for beginners",
-        "ada": "Statically typed, imperative programming language",
-        "lisp": "Family of programming languages with a distinctive parenthesized syntax",
-        "prolog": "Logic programming language associated with artificial intelligence",
-        "erlang": "General-purpose, concurrent programming language",
-        "ocaml": "General-purpose programming language with an emphasis on expressiveness",
-        "fsharp": "Functional-first programming language",
-        "groovy": "Dynamic language for the Java platform",
-        "julia": "High-level, high-performance programming language for technical computing",
-        "nim": "Statically typed, compiled programming language",
-        "zig": "General-purpose programming language and toolchain",
-        "v": "Simple, fast, compiled language for developing maintainable software",
-        "crystal": "Statically typed, compiled programming language",
-        "odin": "Data-oriented programming language",
-        "carbon": "Experimental successor to C++",
-        "mojo": "Programming language for AI developers"
-    }
-    return descriptions.get(language.lower(), "Programming language") 
\ No newline at end of file
+    record = _LANG_RECORDS.get(language.lower())
+    return record.description if record else "Programming language" 